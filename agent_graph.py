@@ -1,59 +1,142 @@
 from langgraph.graph import StateGraph
-from typing import TypedDict, List
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
+from typing import TypedDict, List, Annotated
 from langchain_google_genai import ChatGoogleGenerativeAI
-from vector_store import load_vector_db
-from config import db, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-from neo4j import GraphDatabase
+from vector_store import load_generation, current_generation_path, get_embeddings
+from index_manager import VectorIndexManager
+from keyword_index import load_keyword_index
+from query_batcher import MicroBatcher
+from graph_db.queries import fulltext_query
+from question_router import QuestionRouter
+from fast_answers import FastAnswers
+from config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+    SEMANTIC_TIMEOUT, KEYWORD_TIMEOUT, GRAPH_TIMEOUT, INDEX_WATCH_SECONDS,
+    BACKEND_RETRY_SECONDS, BACKEND_RETRY_MAX_SECONDS,
+    NEO4J_DATABASE, NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT, NEO4J_CONNECTION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME, NEO4J_QUERY_TIMEOUT, FAST_ANSWERS_ENABLED
+)
+from neo4j import AsyncGraphDatabase, unit_of_work
+from graph_cache import GraphResultCache
+from metrics import (
+    track_backend, instrument_node, record_tokens, RETRIEVAL_FALLBACKS, CONTEXT_CHARS, CONTEXT_ITEMS,
+    ROUTED_QUESTIONS, ROUTED_BRANCHES
+)
 import asyncio
+import logging
+import numpy as np
+import operator
 import os
-from langchain.memory import ConversationBufferMemory
+import time
+from session_memory import ConversationMemory, make_session_store
 from langchain.prompts import PromptTemplate
 from langchain_core.runnables import RunnableSequence
-from langchain.schema import Document
+from langchain_core.messages import message_chunk_to_message
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # Initialize Neo4j AuraDB connection
 class Neo4jConnector:
+    """Shared async driver with an explicitly sized pool; reads run in routed read transactions"""
     _instance = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.driver = GraphDatabase.driver(
+            cls._instance.driver = AsyncGraphDatabase.driver(
                 NEO4J_URI,
-                auth=(NEO4J_USER, NEO4J_PASSWORD)
+                auth=(NEO4J_USER, NEO4J_PASSWORD),
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME
             )
+            cls._instance.cache = GraphResultCache()
+            cls._instance.queries = 0
+            cls._instance.errors = 0
+            cls._instance.in_flight = 0
+            cls._instance.max_in_flight = 0
+            cls._instance.total_seconds = 0.0
         return cls._instance
     
-    def query(self, cypher, params=None):
+    async def query(self, cypher, params=None, timeout=NEO4J_QUERY_TIMEOUT):
+        """Run a read query; errors propagate to the caller (graph_step falls back via run_branch)"""
+        # Transaction functions take the timeout from the decorator; tx.run rejects Query objects
+        @unit_of_work(timeout=timeout)
+        async def work(tx):
+            result = await tx.run(cypher, params)
+            return [dict(record) async for record in result]
+
+        self.queries += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.monotonic()
         try:
-            with self.driver.session() as session:
-                result = session.run(cypher, params)
-                return [dict(record) for record in result]
-        except Exception as e:
-            print(f"Neo4j query error: {str(e)}")
-            return []
-
-# Initialize connection
-try:
-    neo4j = Neo4jConnector()
-    test_result = neo4j.query("RETURN 1 AS test")
-    if test_result and test_result[0]['test'] == 1:
-        print(f"✅ Neo4j AuraDB connected at {datetime.now()}")
-    else:
-        raise ConnectionError("Neo4j connection test failed")
-except Exception as e:
-    print(f"❌ Neo4j connection failed: {str(e)}")
-    raise
+            with track_backend("neo4j"):
+                async with self.driver.session(database=NEO4J_DATABASE) as session:
+                    return await session.execute_read(work)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_seconds += time.monotonic() - started
+
+    async def cached_query(self, name, params=None):
+        """GRAPH_QUERIES[name] through the TTL result cache"""
+        return await self.cache.get_or_fetch(name, params, lambda: self.query(GRAPH_QUERIES[name], params))
+
+    def stats(self):
+        completed = self.queries - self.in_flight
+        return {
+            "pool": {
+                "max_size": NEO4J_MAX_POOL_SIZE,
+                "acquisition_timeout_seconds": NEO4J_ACQUISITION_TIMEOUT,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight
+            },
+            "queries": self.queries,
+            "errors": self.errors,
+            "avg_query_ms": self.total_seconds / completed * 1000 if completed else 0.0,
+            "cache": self.cache.stats()
+        }
+
+    async def close(self):
+        await self.driver.close()
+
+# Initialize connection (the async driver is verified from the app's event loop)
+neo4j = Neo4jConnector()
+
+async def verify_neo4j():
+    try:
+        test_result = await neo4j.query("RETURN 1 AS test")
+        if test_result and test_result[0]['test'] == 1:
+            logger.info("Neo4j AuraDB connected")
+        else:
+            raise ConnectionError("Neo4j connection test failed")
+    except Exception as e:
+        logger.error("Neo4j connection failed", extra={"fields": {"error": str(e)}})
+        raise
 
 class GraphState(TypedDict):
     question: str
-    raw_data: List[str]  # Maintain original field name
+    question_vector: List[float]  # Optional; set when the caller already embedded the question
+    session_id: str  # Optional; keys the conversation memory
+    chat_history: str  # Bounded history for the prompt, loaded in retrieve_step
+    intent: str  # Set by route_step: product, shop, sales, account, smalltalk or unknown
+    route_confidence: float
+    routed: bool  # False when the router was unsure and every branch ran
+    branches: List[str]  # Retrieval branches route_step decided to run
+    collections: List[str]  # Vector partitions worth searching
+    graph_query: str  # GRAPH_QUERIES key for graph_step
+    entities: dict  # Catalogue names found in the question: {"product": [...], "shop": [...]}
+    raw_data: Annotated[List[str], operator.add]  # Maintain original field name; each branch appends
     semantic_results: List[str]
     keyword_results: List[str]
     graph_results: List[dict]
+    graph_records: List[dict]  # Unformatted graph rows, for the templated fast path
+    fast_path: bool  # True when explain_step answered from a template instead of the LLM
+    degraded: Annotated[bool, operator.or_]  # A retrieval branch timed out or failed; the answer is not cached
     final_answer: str
 
 # Initialize model
@@ -65,19 +148,36 @@ llm = ChatGoogleGenerativeAI(
     max_output_tokens=2048
 )
 
-# Memory setup
-memory = ConversationBufferMemory(
-    return_messages=True,
-    memory_key="chat_history",
-    input_key="question",
-    output_key="final_answer"
-)
+# Memory setup: bounded history per session_id, older turns summarised by the LLM
+summary_prompt = PromptTemplate.from_template("""
+Condense this conversation between a user and a food business assistant into at most 120 words.
+Keep product names, prices, shops and anything the user said they want or asked about.
+
+Summary so far:
+{summary}
+
+Newer turns:
+{turns}
+
+Updated summary:
+""")
+summary_chain: RunnableSequence = summary_prompt | llm
+
+async def summarize_turns(summary, turns):
+    with track_backend("llm_summary"):
+        response = await summary_chain.ainvoke({
+            "summary": summary or "(none)",
+            "turns": ConversationMemory.format_turns(turns)
+        })
+    record_tokens("summary", response)
+    return response.content.strip()
 
-# Cypher queries
+memory = ConversationMemory(make_session_store(), summarize_turns)
+
+# Cypher queries (full-text indexes are created by graph_db/builder.py)
 GRAPH_QUERIES = {
     "product_search": """
-    MATCH (p:Product)
-    WHERE toLower(p.name) CONTAINS toLower($query)
+    CALL db.index.fulltext.queryNodes('product_fulltext', $query) YIELD node AS p, score
     RETURN p {
         .name,
         .price,
@@ -85,23 +185,26 @@ GRAPH_QUERIES = {
         .quantity,
         available_at: [(p)<-[:SELLS]-(s:Shop) | s {.name, .address, .phone}],
         related: [(p)-[:RELATED_TO]->(r:Product) | r {.name, .price}]
-    }
-    ORDER BY p.name
+    } AS p, score
+    ORDER BY score DESC
     LIMIT 5
     """,
     "shop_search": """
-    MATCH (s:Shop)-[:SELLS]->(p:Product)
-    WHERE toLower(s.name) CONTAINS toLower($query)
+    CALL db.index.fulltext.queryNodes('shop_fulltext', $query) YIELD node AS s, score
     RETURN s {
         .name,
         .address,
         .phone,
-        products: COLLECT(DISTINCT p {.name, .price})[0..5]
-    }
+        products: [(s)-[:SELLS]->(p:Product) | p {.name, .price}][0..5]
+    } AS s, score
+    ORDER BY score DESC
     LIMIT 3
     """
 }
 
+# Parallel retrieval branches joined before the explain node; route_step picks which of them run
+RETRIEVAL_BRANCHES = ["semantic_search", "keyword_search", "graph_search"]
+
 # Prompt template with enhanced instructions
 prompt = PromptTemplate.from_template("""
 # FOOD BUSINESS ASSISTANT
@@ -116,6 +219,9 @@ prompt = PromptTemplate.from_template("""
 3. KNOWLEDGE GRAPH (relationships):
 {graph_results}
 
+## CONVERSATION SO FAR:
+{chat_history}
+
 ## USER QUESTION:
 {question}
 
@@ -148,45 +254,33 @@ Generate the most helpful response possible:
 # Chain setup
 explain_chain: RunnableSequence = prompt | llm
 
-# Initialize retrievers
-vector_db = load_vector_db()
-semantic_retriever = vector_db.as_retriever(
-    search_type="similarity",
-    search_kwargs={"k": 5, "score_threshold": 0.7}
-)
-
-# Temporarily disabled keyword retriever
-# def get_bm25_documents():
-#     documents = []
-#     for collection_name in ['inventories', 'shops', 'invoiceitems']:
-#         for doc in db[collection_name].find({}, {"_id": 0}):
-#             text = f"{doc.get('productName', doc.get('shopName', ''))}\n"
-#             text += f"{doc.get('description', doc.get('shopAddress', ''))}\n"
-#             text += f"Price: {doc.get('price', doc.get('productPrice', 'N/A'))} LKR"
-#             documents.append(Document(
-#                 page_content=text,
-#                 metadata={
-#                     "source": collection_name,
-#                     "name": doc.get('productName', doc.get('shopName', 'Unknown'))
-#                 }
-#             ))
-#     return documents
-
-# keyword_retriever = BM25Retriever.from_documents(get_bm25_documents())
-# keyword_retriever.k = 5
-
-# Using only semantic retriever for now
-retriever = EnsembleRetriever(
-    retrievers=[semantic_retriever],
-    weights=[1.0]  # 100% weight to semantic retriever
-)
+# Retrieval backends are loaded by init_backends() from the app's lifespan, not at import:
+# the published FAISS generation (one partition per Mongo collection, hot-swapped by
+# watch_vector_index) and the prebuilt BM25 index from keyword_index.py
+def load_warm_generation(directory):
+    store = load_generation(directory)
+    for partition in store.partitions.values():  # touch each partition once before it takes traffic
+        if partition.index.ntotal:
+            partition.index.search(np.zeros((1, partition.index.d), dtype=np.float32), 1)
+    return store
+
+vector_index = VectorIndexManager(current_generation_path, load_warm_generation)
+keyword_index = None
+# Catalogue names for the router are loaded with the backends and reloaded with each index generation
+router = QuestionRouter()
+fast_answers = FastAnswers(enabled=FAST_ANSWERS_ENABLED)
+
+# component -> {"status": "pending" | "loading" | "ready" | "missing" | "failed", ...}; see readiness()
+components = {name: {"status": "pending"} for name in ("vector_index", "keyword_index", "neo4j", "router_vocabulary")}
+REQUIRED_COMPONENTS = ["vector_index", "neo4j"]  # the keyword branch and router vocabulary are optional
+RETRIED_STATUSES = ("failed", "missing")
+retries = {}  # component -> (failed attempts, monotonic time of the next retry)
 
 def format_semantic_results(docs):
     return [f"[collection: {doc.metadata.get('source', 'unknown')}]\n{doc.page_content}" for doc in docs]
 
 def format_keyword_results(docs):
-    return []  # Return empty list since keyword search is disabled
-    # return [f"[collection: {doc.metadata.get('source', 'unknown')}]\n{doc.page_content}" for doc in docs]
+    return [f"[collection: {doc.metadata.get('source', 'unknown')}]\n{doc.page_content}" for doc in docs]
 
 def format_graph_results(results):
     if not results:
@@ -211,88 +305,282 @@ def format_graph_results(results):
             )
     return formatted
 
-def retrieve_step(state: GraphState):
+async def run_branch(name, coro, timeout, default):
+    """Await one retrieval backend: (result, False), or (`default`, True) if it is late or fails"""
+    try:
+        return await asyncio.wait_for(coro, timeout), False
+    except asyncio.TimeoutError:
+        RETRIEVAL_FALLBACKS.labels(name, "timeout").inc()
+        logger.warning("Retrieval timed out, continuing without it",
+                       extra={"fields": {"branch": name, "timeout_seconds": timeout}})
+    except Exception as e:
+        RETRIEVAL_FALLBACKS.labels(name, "error").inc()
+        logger.warning("Retrieval failed, continuing without it", extra={"fields": {"branch": name, "error": str(e)}})
+    return default, True
+
+async def retrieve_step(state: GraphState):
+    """Load the conversation so far; route_step decides what to retrieve"""
     question = state["question"]
-    print(f"\n🔍 Retrieving data for: {question}")
-    
+    logger.info("Retrieving", extra={"fields": {"question": question}})
+    chat_history = state.get("chat_history")
+    if chat_history is None:  # the API passes it in; direct graph callers may not
+        try:
+            chat_history = await memory.history(state.get("session_id"))
+        except Exception as e:
+            logger.warning("Could not load session history", extra={"fields": {"error": str(e)}})
+            chat_history = ""
+    return {"question": question, "chat_history": chat_history}
+
+def route_step(state: GraphState):
+    """Classify the question and pick the retrieval branches, partitions and graph query it needs"""
+    route = router.route(state["question"], follow_up=bool(state.get("chat_history")))
+    ROUTED_QUESTIONS.labels(route["intent"], "routed" if route["routed"] else "fallback").inc()
+    ROUTED_BRANCHES.observe(len(route["branches"]))
+    logger.info("Routed question", extra={"fields": {
+        key: route[key] for key in ("intent", "route_confidence", "routed", "branches", "collections", "graph_query")
+    }})
+    return route
+
+def pick_branches(state: GraphState):
+    """Conditional fan-out: the routed branches run in parallel; with none, straight to explain"""
+    return state.get("branches") or ["explain"]
+
+async def embed_questions(questions):
+    with track_backend("embedding"):
+        return await get_embeddings().aembed_queries(questions)
+
+async def search_vectors(requests):
+    """requests: [(question vector, partitions)] -> one list of Documents per request"""
+    def search():
+        with track_backend("faiss"), vector_index.acquire() as vector_db:
+            return vector_db.batch_search_with_score_by_vector(
+                [vector for vector, _ in requests], 5, [collections for _, collections in requests]
+            )
+    results = await asyncio.to_thread(search)
+    return [[doc for doc, _ in hits] for hits in results]
+
+# Concurrent requests share one embedding call and one matrix FAISS search per window
+embedding_batcher = MicroBatcher(embed_questions)
+search_batcher = MicroBatcher(search_vectors)
+
+async def embed_question(question):
+    return await embedding_batcher.submit(question)
+
+async def semantic_search(question, vector, collections):
+    if vector is None:
+        vector = await embed_question(question)
+    return await search_batcher.submit((vector, collections))
+
+def schedule_retry(name):
+    """Back off exponentially (capped) before the next attempt; returns the delay"""
+    attempts = retries.get(name, (0, 0))[0] + 1
+    delay = min(BACKEND_RETRY_SECONDS * 2 ** (attempts - 1), BACKEND_RETRY_MAX_SECONDS)
+    retries[name] = (attempts, time.monotonic() + delay)
+    return delay
+
+async def init_component(name, load):
+    components[name] = {"status": "loading"}
+    started = time.monotonic()
     try:
-        # 1. Hybrid Search (only semantic for now)
-        semantic_docs = semantic_retriever.invoke(question)
-        keyword_docs = []  # Empty list since keyword search is disabled
-        # keyword_docs = keyword_retriever.invoke(question)
-        
-        # 2. Graph Search
-        if any(word in question.lower() for word in ['shop', 'store', 'location']):
-            graph_results = neo4j.query(GRAPH_QUERIES["shop_search"], {"query": question})
-        else:
-            graph_results = neo4j.query(GRAPH_QUERIES["product_search"], {"query": question})
-        
-        # Combine all results into raw_data
-        raw_data = (
-            format_semantic_results(semantic_docs) + 
-            format_keyword_results(keyword_docs) + 
-            format_graph_results(graph_results)
-        )
-        
-        return {
-            "question": question,
-            "raw_data": raw_data,
-            "semantic_results": "\n".join(format_semantic_results(semantic_docs)),
-            "keyword_results": "\n".join(format_keyword_results(keyword_docs)),
-            "graph_results": "\n".join(format_graph_results(graph_results))
-        }
+        status = await load() or "ready"
     except Exception as e:
-        print(f"⚠️ Retrieval error: {str(e)}")
-        return state
+        delay = schedule_retry(name)
+        logger.error("Backend failed to initialise", extra={"fields": {
+            "component": name, "error": str(e), "attempts": retries[name][0], "retry_in_seconds": delay
+        }})
+        components[name] = {"status": "failed", "error": str(e), "seconds": round(time.monotonic() - started, 2),
+                            "attempts": retries[name][0], "retry_in_seconds": delay}
+        return
+    if status in RETRIED_STATUSES:
+        schedule_retry(name)
+    else:
+        retries.pop(name, None)
+    components[name] = {"status": status, "seconds": round(time.monotonic() - started, 2)}
+    logger.info("Backend initialised", extra={"fields": {
+        "component": name, "status": status, "seconds": round(time.monotonic() - started, 2)
+    }})
+
+async def load_vector_backend():
+    await asyncio.to_thread(vector_index.refresh)
+    # Warm-up: one embedding round trip and one search, so the first request pays for neither
+    vector = await embed_question("warm-up")
+    await search_batcher.submit((vector, None))
+
+async def load_keyword_backend():
+    global keyword_index
+    keyword_index = await asyncio.to_thread(load_keyword_index)
+    if keyword_index is None:
+        return "missing"
+    await asyncio.to_thread(keyword_index.search, "warm-up", 1)
+
+async def load_router_vocabulary():
+    await asyncio.to_thread(router.load)
+
+async def load_graph_backend():
+    await verify_neo4j()
+    await neo4j.query(GRAPH_QUERIES["product_search"], {"query": "warmup"})  # uncached: warms the pool
+
+BACKEND_LOADERS = {
+    "vector_index": load_vector_backend,
+    "keyword_index": load_keyword_backend,
+    "neo4j": load_graph_backend,
+    "router_vocabulary": load_router_vocabulary
+}
 
-def explain_step(state: GraphState) -> GraphState:
-    print("🧠 Generating explanation...")
-    
-    response = asyncio.run(
-        asyncio.to_thread(
-            explain_chain.invoke,
-            {
-                "data": "\n\n".join(state["raw_data"]),
-                "question": state["question"],
-                "semantic_results": state["semantic_results"],
-                "keyword_results": state["keyword_results"],
-                "graph_results": state["graph_results"],
-                "current_date": datetime.now().strftime("%Y-%m-%d")
-            }
+async def init_backends():
+    """Load and warm the retrieval backends concurrently; progress is reported by readiness()"""
+    await asyncio.gather(*(init_component(name, load) for name, load in BACKEND_LOADERS.items()))
+
+retry_tasks = set()
+
+def retry_failed_backends():
+    """Start another attempt for every failed or missing backend whose backoff has elapsed"""
+    now = time.monotonic()
+    for name, load in BACKEND_LOADERS.items():
+        if components[name]["status"] in RETRIED_STATUSES and retries.get(name, (0, 0))[1] <= now:
+            logger.info("Retrying backend", extra={"fields": {
+                "component": name, "attempt": retries.get(name, (0, 0))[0] + 1
+            }})
+            components[name] = {"status": "loading"}  # not picked up again while this attempt runs
+            task = asyncio.create_task(init_component(name, load))
+            retry_tasks.add(task)
+            task.add_done_callback(retry_tasks.discard)
+
+async def watch_vector_index():
+    """Background task: swap in index generations as build/update jobs publish them, and retry
+    backends that failed to load (a transient Neo4j or Gemini error must not leave the pod unready)"""
+    while True:
+        await asyncio.sleep(INDEX_WATCH_SECONDS)
+        retry_failed_backends()
+        if components["vector_index"]["status"] != "ready":
+            continue  # loading, or waiting for its retry; refresh() would race the load
+        try:
+            if await asyncio.to_thread(vector_index.refresh):
+                await init_component("router_vocabulary", load_router_vocabulary)  # the catalogue moved with it
+        except Exception as e:
+            logger.warning("Index generation refresh failed", extra={"fields": {"error": str(e)}})
+
+def readiness():
+    ready = all(components[name]["status"] == "ready" for name in REQUIRED_COMPONENTS)
+    vector_status = {**components["vector_index"], "generation": vector_index.generation}
+    return ready, {**components, "vector_index": vector_status}
+
+async def semantic_step(state: GraphState):
+    search = semantic_search(state["question"], state.get("question_vector"), state.get("collections"))
+    semantic_docs, degraded = await run_branch("semantic", search, SEMANTIC_TIMEOUT, [])
+    formatted = format_semantic_results(semantic_docs)
+    CONTEXT_ITEMS.labels("semantic").observe(len(formatted))
+    return {"raw_data": formatted, "semantic_results": "\n".join(formatted), "degraded": degraded}
+
+def search_keywords(index, question):
+    with track_backend("bm25"):
+        return index.search(question, 5)
+
+async def keyword_step(state: GraphState):
+    keyword_docs, degraded = [], False
+    if keyword_index is not None:
+        keyword_docs, degraded = await run_branch(
+            "keyword", asyncio.to_thread(search_keywords, keyword_index, state["question"]), KEYWORD_TIMEOUT, []
         )
-    )
+    formatted = format_keyword_results(keyword_docs)
+    CONTEXT_ITEMS.labels("keyword").observe(len(formatted))
+    return {"raw_data": formatted, "keyword_results": "\n".join(formatted), "degraded": degraded}
+
+async def graph_step(state: GraphState):
+    question = state["question"]
+    query_name = state.get("graph_query") or "product_search"
+    search_terms = fulltext_query(question)
+    if search_terms is None:
+        return {"raw_data": [], "graph_results": "", "graph_records": []}
 
-    memory.chat_memory.add_ai_message(response.content)
-    print("✅ Got response from LLM.")
+    graph_results, degraded = await run_branch(
+        "graph", neo4j.cached_query(query_name, {"query": search_terms}), GRAPH_TIMEOUT, []
+    )
+    formatted = format_graph_results(graph_results)
+    CONTEXT_ITEMS.labels("graph").observe(len(formatted))
+    return {"raw_data": formatted, "graph_results": "\n".join(formatted), "graph_records": graph_results,
+            "degraded": degraded}
+
+async def explain_step(state: GraphState) -> GraphState:
+    # Unambiguous lookups the graph fully answered skip the LLM
+    response = fast_answers.answer(state)
+    if response is not None:
+        memory.remember(state.get("session_id"), state["question"], response.content)
+        logger.info("Answered from template", extra={"fields": {
+            "intent": state.get("intent"), "answer_chars": len(response.content)
+        }})
+        return {"question": state["question"], "final_answer": response, "fast_path": True}
+
+    context = {
+        "semantic_results": state.get("semantic_results", ""),
+        "keyword_results": state.get("keyword_results", ""),
+        "graph_results": state.get("graph_results", ""),
+        "chat_history": state.get("chat_history") or "(new conversation)"
+    }
+    for source, text in context.items():
+        CONTEXT_CHARS.labels(source.removesuffix("_results")).observe(len(text))
+    logger.info("Generating explanation", extra={"fields": {
+        "context_chars": sum(len(text) for text in context.values())
+    }})
+
+    # Stream the completion so graph.astream(stream_mode="messages") can forward tokens as they arrive
+    response = None
+    with track_backend("llm"):
+        async for chunk in explain_chain.astream({
+            "data": "\n\n".join(state.get("raw_data", [])),
+            "question": state["question"],
+            **context,
+            "current_date": datetime.now().strftime("%Y-%m-%d")
+        }):
+            response = chunk if response is None else response + chunk
+    response = message_chunk_to_message(response)
+    record_tokens("explain", response)
+
+    memory.remember(state.get("session_id"), state["question"], response.content)
+    usage = response.usage_metadata or {}
+    logger.info("Got response from LLM", extra={"fields": {
+        "answer_chars": len(response.content),
+        "prompt_tokens": usage.get("input_tokens"),
+        "completion_tokens": usage.get("output_tokens")
+    }})
 
     return {
         "question": state["question"],
-        "raw_data": state["raw_data"],
-        "final_answer": response,  # Keep the full response object
-        "semantic_results": state["semantic_results"],
-        "keyword_results": state["keyword_results"],
-        "graph_results": state["graph_results"]
+        "final_answer": response  # Keep the full response object
     }
 
 def final_step(state: GraphState) -> GraphState:
     """Maintain the exact original response format"""
     return {
         "question": state["question"],
-        "raw_data": state["raw_data"],
         "final_answer": state["final_answer"],  # Full response object
-        "response": state["final_answer"].content  # Just the content for backward compatibility
+        "response": state["final_answer"].content,  # Just the content for backward compatibility
+        "degraded": state.get("degraded", False)
     }
 
 def build_graph():
     workflow = StateGraph(GraphState)
-    workflow.add_node("retrieve", retrieve_step)
-    workflow.add_node("explain", explain_step)
-    workflow.add_node("final", final_step)
+    # Every node reports latency, errors and in-flight counts to /metrics
+    workflow.add_node("retrieve", instrument_node("retrieve", retrieve_step))
+    workflow.add_node("route", instrument_node("route", route_step))
+    workflow.add_node("semantic_search", instrument_node("semantic_search", semantic_step))
+    workflow.add_node("keyword_search", instrument_node("keyword_search", keyword_step))
+    workflow.add_node("graph_search", instrument_node("graph_search", graph_step))
+    workflow.add_node("explain", instrument_node("explain", explain_step))
+    workflow.add_node("final", instrument_node("final", final_step))
     
     workflow.set_entry_point("retrieve")
-    workflow.add_edge("retrieve", "explain")
+    workflow.add_edge("retrieve", "route")
+    # The routed branches run in the same superstep; explain starts once all of them are done
+    workflow.add_conditional_edges("route", pick_branches, RETRIEVAL_BRANCHES + ["explain"])
+    for branch in RETRIEVAL_BRANCHES:
+        workflow.add_edge(branch, "explain")
     workflow.add_edge("explain", "final")
     
     return workflow.compile()
 
-__all__ = ["build_graph", "explain_chain", "neo4j"]
+__all__ = [
+    "build_graph", "explain_chain", "neo4j", "init_backends", "watch_vector_index", "readiness",
+    "embed_question", "RETRIEVAL_BRANCHES", "router", "fast_answers", "embedding_batcher", "search_batcher",
+    "vector_index", "memory"
+]
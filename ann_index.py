@@ -0,0 +1,216 @@
+#ann_index.py
+import glob
+import json
+import os
+import sys
+import time
+import numpy as np
+import faiss
+from langchain.docstore.document import Document
+from config import (
+    VECTOR_INDEX_TYPE, ANN_TRAIN_SAMPLE, ANN_MIN_VECTORS, ANN_TOMBSTONE_RATIO, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH,
+    IVF_NLIST, IVF_NPROBE, PQ_M
+)
+
+INDEX_TYPES = ["flat", "hnsw", "ivf_pq", "ivf_sq8"]
+ADD_BATCH = 10000
+
+def auto_nlist(count):
+    """~4*sqrt(n) inverted lists, but keep >= 39 training points per centroid"""
+    return max(1, min(int(4 * np.sqrt(count)), count // 39 or 1))
+
+def make_index(index_type, dim, count):
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+    nlist = IVF_NLIST or auto_nlist(count)
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_pq":
+        m = PQ_M if dim % PQ_M == 0 else next(m for m in range(min(PQ_M, dim), 0, -1) if dim % m == 0)
+        return faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8)
+    if index_type == "ivf_sq8":
+        return faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit)
+    raise ValueError(f"Unknown VECTOR_INDEX_TYPE {index_type!r}; expected one of {INDEX_TYPES}")
+
+def set_search_params(index, ef_search=HNSW_EF_SEARCH, nprobe=IVF_NPROBE):
+    """Apply the query-time knobs (efSearch for HNSW, nprobe for IVF)"""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    return index
+
+def index_from_vectors(vectors, index_type, seed=0):
+    """Build an index of `index_type`, training on a random sample when the type needs it"""
+    count, dim = vectors.shape
+    index = make_index(index_type, dim, count)
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(count, size=min(count, ANN_TRAIN_SAMPLE), replace=False)]
+        index.train(sample)
+    for start in range(0, count, ADD_BATCH):
+        index.add(vectors[start:start + ADD_BATCH])
+    return set_search_params(index)
+
+def all_vectors(index):
+    """Read every vector back out (approximate for PQ/SQ8 indexes)"""
+    if isinstance(index, faiss.IndexIVF):
+        index = faiss.clone_index(index)  # the live index must keep a removable (no) direct map
+        index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+def convert_index(vector_db, index_type=VECTOR_INDEX_TYPE):
+    """Replace a LangChain FAISS store's flat index with `index_type`, keeping vector positions.
+    No-op for partitions below ANN_MIN_VECTORS or already converted, so sync jobs can call it after every update."""
+    if index_type == "flat" or vector_db.index.ntotal < ANN_MIN_VECTORS or index_type_of(vector_db.index) != "flat":
+        return vector_db
+    started = time.monotonic()
+    vector_db.index = index_from_vectors(all_vectors(vector_db.index), index_type)
+    print(f"✅ Built {index_type} index over {vector_db.index.ntotal} vectors in {time.monotonic() - started:.1f}s")
+    return vector_db
+
+def index_type_of(index):
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_sq8"
+    return "flat"
+
+def tombstones(vector_db):
+    """Vectors still in the index whose position no longer maps to a document (see delete_vectors)"""
+    return vector_db.index.ntotal - len(vector_db.index_to_docstore_id)
+
+def add_vectors(vector_db, text_embeddings, metadatas, ids):
+    """Add (text, vector) pairs to a LangChain FAISS store.
+
+    LangChain numbers new vectors from len(index_to_docstore_id), which is
+    wrong once deletes have left tombstones; FAISS numbers them from ntotal.
+    """
+    start = vector_db.index.ntotal
+    vector_db.index.add(np.asarray([vector for _, vector in text_embeddings], dtype=np.float32))
+    vector_db.docstore.add({
+        doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+        for (text, _), metadata, doc_id in zip(text_embeddings, metadatas, ids)
+    })
+    vector_db.index_to_docstore_id.update({start + i: doc_id for i, doc_id in enumerate(ids)})
+    return ids
+
+def delete_vectors(vector_db, ids):
+    """Remove docstore ids from a LangChain FAISS store whatever its index type.
+
+    Flat indexes remove the vectors (remove_ids renumbers them, as LangChain's
+    delete expects). HNSW cannot remove and IVF keeps its labels, so for ANN
+    indexes the positions become tombstones: the vector stays but no longer
+    maps to a document, and searches skip it. The index is compacted once
+    tombstones pass ANN_TOMBSTONE_RATIO of it.
+    """
+    if index_type_of(vector_db.index) == "flat":
+        return vector_db.delete(ids)
+
+    removed = set(ids)
+    positions = [position for position, doc_id in vector_db.index_to_docstore_id.items() if doc_id in removed]
+    for position in positions:
+        del vector_db.index_to_docstore_id[position]
+    vector_db.docstore.delete(list(removed))
+    if tombstones(vector_db) > ANN_TOMBSTONE_RATIO * vector_db.index.ntotal:
+        compact_index(vector_db)
+    return True
+
+def compact_index(vector_db):
+    """Rebuild an ANN index from its live vectors, dropping tombstones; IVF keeps its trained quantizer"""
+    started = time.monotonic()
+    dropped = tombstones(vector_db)
+    keep = sorted(vector_db.index_to_docstore_id)
+    vectors = all_vectors(vector_db.index)[keep]
+    if isinstance(vector_db.index, faiss.IndexIVF):
+        index = faiss.clone_index(vector_db.index)
+        index.reset()
+        for start in range(0, len(vectors), ADD_BATCH):
+            index.add(vectors[start:start + ADD_BATCH])
+        vector_db.index = set_search_params(index)
+    else:
+        vector_db.index = index_from_vectors(vectors, index_type_of(vector_db.index))
+    vector_db.index_to_docstore_id = {
+        i: vector_db.index_to_docstore_id[position] for i, position in enumerate(keep)
+    }
+    print(f"✅ Compacted {index_type_of(vector_db.index)} index: {dropped} deleted vectors dropped, "
+          f"{vector_db.index.ntotal} kept in {time.monotonic() - started:.1f}s")
+    return vector_db
+
+def resident_memory():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def read_vectors(index_path):
+    """Every vector of a built index directory, across its per-collection partitions"""
+    paths = sorted(glob.glob(os.path.join(index_path, "*", "index.faiss"))) or [os.path.join(index_path, "index.faiss")]
+    return np.concatenate([all_vectors(faiss.read_index(path)) for path in paths])
+
+def benchmark(index_path, queries=500, k=5, output="ann_benchmark.json"):
+    """Compare each index type against the exact flat index on the vectors of a built index.
+
+    Queries are stored vectors with Gaussian noise added, so they resemble
+    real questions landing near, not on, indexed chunks. Reports recall@k,
+    single-query p50/p99 latency, build time, serialized size and RSS growth
+    for a sweep of efSearch / nprobe values.
+    """
+    vectors = np.ascontiguousarray(read_vectors(index_path), dtype=np.float32)
+    rng = np.random.default_rng(42)
+    picks = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+    noise = rng.normal(scale=vectors.std() * 0.1, size=(len(picks), vectors.shape[1]))
+    query_vectors = (vectors[picks] + noise).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(query_vectors, k)
+
+    sweeps = {"flat": [None], "hnsw": [16, 32, 64, 128, 256], "ivf_pq": [1, 4, 16, 64], "ivf_sq8": [1, 4, 16, 64]}
+    results = []
+    for index_type, settings in sweeps.items():
+        rss_before = resident_memory()
+        started = time.monotonic()
+        index = index_from_vectors(vectors, index_type)
+        build_seconds = time.monotonic() - started
+        rss_growth = resident_memory() - rss_before
+        size = len(faiss.serialize_index(index))
+        for setting in settings:
+            if setting is not None:
+                set_search_params(index, ef_search=setting, nprobe=setting)
+            latencies = []
+            found = np.empty_like(truth)
+            for i, query in enumerate(query_vectors):
+                t0 = time.perf_counter()
+                _, found[i:i + 1] = index.search(query[None, :], k)
+                latencies.append(time.perf_counter() - t0)
+            recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(truth))])
+            result = {
+                "index_type": index_type,
+                "param": {"hnsw": "efSearch", "flat": None}.get(index_type, "nprobe"),
+                "value": setting,
+                f"recall@{k}": round(float(recall), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4),
+                "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 4),
+                "build_seconds": round(build_seconds, 2),
+                "index_bytes": size,
+                "rss_growth_bytes": rss_growth
+            }
+            results.append(result)
+            print(json.dumps(result))
+        del index
+
+    report = {"vectors": len(vectors), "dim": int(vectors.shape[1]), "queries": len(query_vectors), "results": results}
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Benchmark written to {output}")
+    return report
+
+if __name__ == "__main__":
+    # python ann_index.py [generation_dir] [output.json]; defaults to the published generation
+    from vector_store import current_generation_path
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else current_generation_path(),
+              output=sys.argv[2] if len(sys.argv) > 2 else "ann_benchmark.json")
@@ -0,0 +1,121 @@
+#answer_cache.py
+import time
+from collections import OrderedDict
+import numpy as np
+from config import ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_SIZE
+from data_version import current_data_version
+
+class SemanticAnswerCache:
+    """Answers keyed by question embedding.
+
+    A lookup hits when the cosine similarity between the new question and a
+    cached one reaches `threshold`. Entries expire after `ttl` seconds, the
+    least recently used entry is evicted past `max_size`, and everything is
+    dropped when the FAISS index or Neo4j graph is rebuilt.
+
+    Vectors live in one preallocated (max_size, dim) matrix; each entry owns a
+    row, so a lookup is a single matrix-vector product with no allocation.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_size=ANSWER_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()  # question -> (matrix row, answer, stored_at)
+        self.matrix = None  # allocated on the first store, once the embedding size is known
+        self.occupied = np.zeros(max_size, dtype=bool)
+        self.free_rows = list(range(max_size - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = current_data_version()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        version = current_data_version()
+        if version != self._version:
+            self._version = version
+            if self.entries:
+                self.clear()
+                self.invalidations += 1
+
+    def _remove(self, question):
+        row, _, _ = self.entries.pop(question)
+        self.occupied[row] = False
+        self.free_rows.append(row)
+
+    def _expire(self, now):
+        expired = [q for q, (_, _, stored_at) in self.entries.items() if now - stored_at > self.ttl]
+        for question in expired:
+            self._remove(question)
+
+    def lookup(self, vector):
+        """Return (answer, similarity) for the closest live entry, or (None, best similarity)"""
+        self._check_version()
+        now = time.monotonic()
+        self._expire(now)
+        if not self.entries:
+            self.misses += 1
+            return None, 0.0
+
+        vector = self._normalize(vector)
+        if vector.shape[0] != self.matrix.shape[1]:  # embedding model changed; nothing cached is comparable
+            self.misses += 1
+            return None, 0.0
+        similarities = self.matrix @ vector
+        similarities[~self.occupied] = -np.inf
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            self.misses += 1
+            return None, similarity
+
+        question = self.row_questions[best]
+        self.entries.move_to_end(question)
+        self.hits += 1
+        return self.entries[question][1], similarity
+
+    def store(self, question, vector, answer):
+        self._check_version()
+        vector = self._normalize(vector)
+        if self.matrix is None or self.matrix.shape[1] != vector.shape[0]:
+            self.clear()
+            self.matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+            self.row_questions = [None] * self.max_size
+        if question in self.entries:
+            self._remove(question)
+        while not self.free_rows:
+            self._remove(next(iter(self.entries)))  # least recently used
+            self.evictions += 1
+        row = self.free_rows.pop()
+        self.matrix[row] = vector
+        self.occupied[row] = True
+        self.row_questions[row] = question
+        self.entries[question] = (row, answer, time.monotonic())
+
+    def clear(self):
+        self.entries.clear()
+        self.occupied[:] = False
+        self.free_rows = list(range(self.max_size - 1, -1, -1))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+answer_cache = SemanticAnswerCache()
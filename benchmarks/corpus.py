@@ -0,0 +1,158 @@
+#benchmarks/corpus.py
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config import SALES_SUMMARY_WINDOWS_DAYS, SALES_SUMMARY_TOP
+from sales_summary import SUMMARY_KINDS, window_field
+
+# Records per collection at scale factor 1
+BASE_COUNTS = {"inventories": 200, "shops": 20, "invoiceitems": 1000, "users": 100}
+
+PRODUCT_TYPES = ["Kg", "g", "L", "ml", "Pack", "Bottle", "Loaf", "Piece"]
+PRODUCT_WORDS = ["Rice", "Dhal", "Sugar", "Flour", "Milk", "Tea", "Coffee", "Biscuits", "Bread", "Butter", "Cheese",
+                 "Noodles", "Soap", "Coconut Oil", "Eggs", "Chicken", "Fish", "Yoghurt", "Juice", "Cola"]
+BRANDS = ["Anchor", "Maliban", "Munchee", "Keells", "Prima", "Elephant House", "Highland", "Kotmale", "Araliya", "Nestle"]
+SHOP_WORDS = ["Super", "Mart", "Stores", "Grocers", "Foods", "Traders", "Market", "Corner", "Express", "Fresh"]
+TOWNS = ["Colombo", "Kandy", "Galle", "Matara", "Negombo", "Jaffna", "Kurunegala", "Ratnapura", "Badulla", "Anuradhapura"]
+
+def object_id(collection_no, i):
+    """Deterministic ObjectId so repeated runs produce identical documents"""
+    return ObjectId(f"{collection_no:08x}{i:016x}")
+
+def make_inventory(rng, i):
+    price = rng.randrange(50, 5000, 10)
+    discounted = rng.random() < 0.3
+    return {
+        "_id": object_id(1, i),
+        "productName": f"{rng.choice(BRANDS)} {rng.choice(PRODUCT_WORDS)} {i}",
+        "productType": rng.choice(PRODUCT_TYPES),
+        "brandName": rng.choice(BRANDS),
+        "price": price,
+        "productPrice": round(price * 0.9) if discounted else price,
+        "productDiscount": 10 if discounted else 0,
+        "discountType": "PERCENTAGE" if discounted else "AMOUNT",
+        "inventoryCategoryId": f"category-{rng.randrange(12)}",
+        "quantity": rng.randrange(0, 500)
+    }
+
+def make_shop(rng, i):
+    town = rng.choice(TOWNS)
+    return {
+        "_id": object_id(2, i),
+        "shopName": f"{town} {rng.choice(SHOP_WORDS)} {i}",
+        "ownerName": f"Owner {i}",
+        "shopAddress": f"{rng.randrange(1, 400)} Main Street, {town}",
+        "phoneNumber": f"07{rng.randrange(10 ** 8):08d}",
+        "serviceCharge": rng.choice([0, 5, 10]),
+        "serviceChargeType": "PERCENTAGE",
+        "deliveryCharge": rng.choice([0, 150, 250, 400]),
+        "shortNote": "Open daily",
+        "__v": 0
+    }
+
+def make_invoice_item(rng, i, products, shops, now):
+    product = rng.choice(products)
+    quantity = rng.randrange(1, 6)
+    return {
+        "_id": object_id(3, i),
+        "productName": product["productName"],
+        "shopName": rng.choice(shops)["shopName"],
+        "price": product["productPrice"],
+        "quantity": quantity,
+        "amount": product["productPrice"] * quantity,
+        "productPrice": product["price"],
+        "productDiscount": product["productDiscount"],
+        "discountType": product["discountType"],
+        "createdAt": now - timedelta(minutes=rng.randrange(60 * 24 * 180))
+    }
+
+def make_user(rng, i):
+    return {
+        "_id": object_id(4, i),
+        "name": f"User {i}",
+        "email": f"user{i}@example.com",
+        "phoneNumber": f"07{rng.randrange(10 ** 8):08d}",
+        "userType": rng.choice(["CUSTOMER", "SHOP_OWNER"]),
+        "role": "USER",
+        "premiumStatus": rng.choice(["ACTIVE", "INACTIVE"]),
+        "verifiedStatus": rng.choice(["VERIFIED", "PENDING"]),
+        "medium": "EMAIL",
+        "isMaintainInventory": rng.random() < 0.2,
+        "password": "not-a-real-hash",
+        "firebaseToken": "token",
+        "__v": 0
+    }
+
+def summarize_sales(invoice_items, now):
+    """What sales_summary.summary_pipeline leaves in sales_summaries, computed in Python
+    (the stand-in database cannot run aggregation pipelines)"""
+    summaries = []
+    for kind, (field, counterpart) in SUMMARY_KINDS.items():
+        groups = {}
+        for item in invoice_items:
+            groups.setdefault(item[field], []).append(item)
+        for name, items in groups.items():
+            units = sum(item["quantity"] for item in items)
+            revenue = sum(item["amount"] for item in items)
+            by_counterpart = {}
+            for item in items:
+                by_counterpart[item[counterpart]] = by_counterpart.get(item[counterpart], 0) + item["quantity"]
+            top = sorted(by_counterpart.items(), key=lambda entry: -entry[1])[:SALES_SUMMARY_TOP]
+            summaries.append({
+                "_id": f"{kind}:{name}",
+                "kind": kind,
+                "name": name,
+                "lines": len(items),
+                "units_sold": units,
+                "revenue": revenue,
+                "min_price": min(item["price"] for item in items),
+                "max_price": max(item["price"] for item in items),
+                "first_sold": min(item["createdAt"] for item in items),
+                "last_sold": max(item["createdAt"] for item in items),
+                **{window_field(days): sum(item["quantity"] for item in items
+                                           if item["createdAt"] >= now - timedelta(days=days))
+                   for days in SALES_SUMMARY_WINDOWS_DAYS},
+                "avg_price": revenue / units if units else None,
+                "discount_rate": sum(1 for item in items if item["productDiscount"]) / len(items),
+                "top": [{"name": counterpart_name, "units": count} for counterpart_name, count in top],
+                "updated_at": now
+            })
+    return summaries
+
+def make_corpus(scale=1, seed=42, now=None):
+    """Synthetic Mongo collections shaped like the production ones; collection -> list of records"""
+    rng = random.Random(seed)
+    now = now or datetime(2025, 1, 1)
+    counts = {name: max(1, int(count * scale)) for name, count in BASE_COUNTS.items()}
+    products = [make_inventory(rng, i) for i in range(counts["inventories"])]
+    shops = [make_shop(rng, i) for i in range(counts["shops"])]
+    invoice_items = [make_invoice_item(rng, i, products, shops, now) for i in range(counts["invoiceitems"])]
+    return {
+        "inventories": products,
+        "shops": shops,
+        "invoiceitems": invoice_items,
+        "sales_summaries": summarize_sales(invoice_items, now),
+        "users": [make_user(rng, i) for i in range(counts["users"])]
+    }
+
+QUESTION_TEMPLATES = [
+    "What is the price of {product}?",
+    "Which shops sell {product}?",
+    "Is there a discount on {brand} products?",
+    "Where is {shop} located?",
+    "What does {shop} charge for delivery?",
+    "How many {product} were sold recently?",
+]
+
+def make_questions(corpus, count, seed=7):
+    """Distinct questions about corpus entities (distinct so the answer cache never short-circuits them)"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        question = rng.choice(QUESTION_TEMPLATES).format(
+            product=rng.choice(corpus["inventories"])["productName"],
+            brand=rng.choice(BRANDS),
+            shop=rng.choice(corpus["shops"])["shopName"]
+        )
+        questions.append(f"{question} (request {i})")
+    return questions
@@ -0,0 +1,277 @@
+#benchmarks/fakes.py
+# Local stand-ins for Gemini, MongoDB and Neo4j with configurable latency, so the
+# real pipeline code can be timed without any external service.
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, List
+from langchain_core.embeddings import Embeddings, DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from neo4j import Query
+from graph_db import builder
+from graph_db.queries import PRODUCT_FULLTEXT_INDEX, SHOP_FULLTEXT_INDEX
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model: waits `first_token_seconds`, then streams `completion_tokens`
+    tokens `token_seconds` apart, and reports token usage like Gemini does"""
+
+    first_token_seconds: float = 0.2
+    token_seconds: float = 0.005
+    completion_tokens: int = 40
+
+    @property
+    def _llm_type(self):
+        return "benchmark-fake"
+
+    def _tokens(self, messages):
+        question = messages[-1].content.rsplit("## USER QUESTION:", 1)[-1].split("##", 1)[0].strip()
+        words = f"**Answer** for {question or 'the request'}:".split()
+        return [f"{words[i % len(words)]} " for i in range(self.completion_tokens)]
+
+    def _usage(self, messages):
+        prompt_tokens = sum(len(str(message.content).split()) for message in messages)
+        return {"input_tokens": prompt_tokens, "output_tokens": self.completion_tokens,
+                "total_tokens": prompt_tokens + self.completion_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_seconds + self.token_seconds * self.completion_tokens)
+        message = AIMessage(content="".join(self._tokens(messages)), usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_seconds + self.token_seconds * self.completion_tokens)
+        message = AIMessage(content="".join(self._tokens(messages)), usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_seconds)
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_seconds)
+            usage = self._usage(messages) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+class LatencyEmbeddings(Embeddings):
+    """Deterministic embeddings that cost `call_seconds` per request plus `text_seconds` per text"""
+
+    def __init__(self, size=768, call_seconds=0.05, text_seconds=0.0005):
+        self.fake = DeterministicFakeEmbedding(size=size)
+        self.call_seconds = call_seconds
+        self.text_seconds = text_seconds
+        self.calls = 0
+
+    def _cost(self, count):
+        self.calls += 1
+        return self.call_seconds + self.text_seconds * count
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._cost(len(texts)))
+        return self.fake.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self._cost(1))
+        return self.fake.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._cost(len(texts)))
+        return self.fake.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self._cost(1))
+        return self.fake.embed_query(text)
+
+class FakeCollection:
+    """The read side of a pymongo collection the build jobs use: find() with a projection, distinct() and count_documents()"""
+
+    def __init__(self, records=None):
+        self.records = records or []
+
+    def find(self, filter=None, projection=None):
+        if filter:
+            raise NotImplementedError("FakeCollection.find only supports an empty filter")
+        included = {key for key, value in (projection or {}).items() if value}
+        excluded = {key for key, value in (projection or {}).items() if not value}
+        for record in self.records:
+            if included:
+                record = {key: value for key, value in record.items()
+                          if key in included or (key == "_id" and "_id" not in excluded)}
+            else:
+                record = {key: value for key, value in record.items() if key not in excluded}
+            yield record
+
+    def distinct(self, key):
+        return list(dict.fromkeys(record[key] for record in self.records if record.get(key) is not None))
+
+    def count_documents(self, filter):
+        return len(self.records)
+
+class FakeDatabase(dict):
+    """collection name -> FakeCollection; unknown collections are empty"""
+
+    def __init__(self, corpus):
+        super().__init__({name: FakeCollection(records) for name, records in corpus.items()})
+
+    def __missing__(self, name):
+        return FakeCollection()
+
+    def list_collection_names(self):
+        return list(self)
+
+class InMemoryGraph:
+    """Products, shops and SELLS links held in dicts.
+
+    The sync side mimics graph_db.builder.Neo4jConnection (one `write_seconds`
+    round trip per write transaction) and `async_driver()` the async driver
+    agent_graph.Neo4jConnector reads through (`read_seconds` per query).
+    """
+
+    def __init__(self, write_seconds=0.01, read_seconds=0.005):
+        self.write_seconds = write_seconds
+        self.read_seconds = read_seconds
+        self.products = {}  # name -> properties
+        self.shops = {}
+        self.sells = {}  # shop name -> set of product names
+        self.writes = 0
+
+    # graph_db.builder.Neo4jConnection interface
+    def execute_query(self, query, parameters=None):
+        if "RETURN 1 AS test_value" in query:
+            return [{"test_value": 1}]
+        return []  # constraints and index creation
+
+    def execute_write(self, query, parameters=None):
+        time.sleep(self.write_seconds)
+        self.writes += 1
+        parameters = parameters or {}
+        if query == builder.DELETE_BATCH_QUERY:
+            return [{"deleted": self._delete_batch(parameters["batch_size"])}]
+        if query == builder.UPSERT_PRODUCTS_QUERY:
+            for row in parameters["rows"]:
+                self.products.setdefault(row["name"], {}).update(row)
+        elif query == builder.UPSERT_SHOPS_QUERY:
+            for row in parameters["rows"]:
+                self.shops.setdefault(row["name"], {}).update(row)
+        elif query == builder.LINK_SELLERS_QUERY:
+            created = 0
+            for row in parameters["rows"]:
+                if row["shop"] in self.shops and row["product"] in self.products:
+                    sold = self.sells.setdefault(row["shop"], set())
+                    created += row["product"] not in sold
+                    sold.add(row["product"])
+            return [{"created": created}]
+        else:
+            raise NotImplementedError(f"InMemoryGraph does not emulate: {query.strip()[:60]}")
+        return []
+
+    def _delete_batch(self, batch_size):
+        deleted = 0
+        for nodes in (self.products, self.shops):
+            while nodes and deleted < batch_size:
+                nodes.pop(next(iter(nodes)))
+                deleted += 1
+        if not self.products and not self.shops:
+            self.sells.clear()
+        return deleted
+
+    # Full-text search stand-in: names (and shop addresses) containing any query term, best first
+    @staticmethod
+    def _terms(lucene_query):
+        return [term for term in re.findall(r"\w+", lucene_query.lower()) if term != "or"]
+
+    @staticmethod
+    def _score(text, terms):
+        words = set(re.findall(r"\w+", text.lower()))
+        return sum(1 for term in terms if term in words)
+
+    def search_products(self, lucene_query, limit=5):
+        terms = self._terms(lucene_query)
+        scored = sorted(((self._score(name, terms), name) for name in self.products), reverse=True)
+        rows = []
+        for score, name in scored[:limit]:
+            if not score:
+                break
+            product = self.products[name]
+            rows.append({"p": {
+                **{key: product.get(key) for key in ("name", "price", "discount_price", "quantity")},
+                "available_at": [
+                    {key: self.shops[shop].get(key) for key in ("name", "address", "phone")}
+                    for shop, names in self.sells.items() if name in names
+                ],
+                "related": []
+            }, "score": float(score)})
+        return rows
+
+    def search_shops(self, lucene_query, limit=3):
+        terms = self._terms(lucene_query)
+        scored = sorted(((self._score(f"{name} {shop.get('address', '')}", terms), name)
+                         for name, shop in self.shops.items()), reverse=True)
+        rows = []
+        for score, name in scored[:limit]:
+            if not score:
+                break
+            shop = self.shops[name]
+            products = sorted(self.sells.get(name, ()))[:5]
+            rows.append({"s": {
+                **{key: shop.get(key) for key in ("name", "address", "phone")},
+                "products": [{"name": product, "price": self.products[product].get("price")} for product in products]
+            }, "score": float(score)})
+        return rows
+
+    def read(self, cypher, params):
+        if "RETURN 1 AS test" in cypher:
+            return [{"test": 1}]
+        if PRODUCT_FULLTEXT_INDEX in cypher:
+            return self.search_products(params["query"])
+        if SHOP_FULLTEXT_INDEX in cypher:
+            return self.search_shops(params["query"])
+        raise NotImplementedError(f"InMemoryGraph does not emulate: {cypher.strip()[:60]}")
+
+    def async_driver(self):
+        return _AsyncDriver(self)
+
+class _AsyncResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def __aiter__(self):
+        for row in self.rows:
+            yield row
+
+class _AsyncTransaction:
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def run(self, query, parameters=None):
+        if isinstance(query, Query):
+            raise TypeError("Query object is only supported for session.run")  # as the real driver does
+        await asyncio.sleep(self.graph.read_seconds)
+        return _AsyncResult(self.graph.read(query, parameters or {}))
+
+class _AsyncSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_read(self, work, *args, **kwargs):
+        return await work(_AsyncTransaction(self.graph), *args, **kwargs)
+
+class _AsyncDriver:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self, **config: Any):
+        return _AsyncSession(self.graph)
+
+    async def close(self):
+        pass
@@ -0,0 +1,263 @@
+#benchmarks/run.py
+# Offline benchmark of the real pipeline code against local stand-ins (benchmarks/fakes.py):
+# build_vector_db and keyword index docs/sec, graph builder rows/sec, and /ask p50/p99 and
+# throughput at several concurrency levels, for each corpus scale factor.
+#
+#   python -m benchmarks.run --scales 1 10 --concurrency 1 8 32
+#   python -m benchmarks.run --baseline benchmark_baseline.json   # exits 1 on a regression
+#
+# Every run writes a JSON report (--output); keep one from a known-good build as the baseline.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Allow `python benchmarks/run.py` as well as `python -m benchmarks.run`
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+# Time the pipeline, not the Gemini quota; export EMBED_REQUESTS_PER_MINUTE to include the limiter
+os.environ.setdefault("EMBED_REQUESTS_PER_MINUTE", "1000000")
+
+import httpx
+import numpy as np
+import agent_graph
+import keyword_index
+import main
+import question_router
+import vector_store
+from embedding_cache import CachedEmbeddings
+from graph_db import builder
+from benchmarks.corpus import make_corpus, make_questions
+from benchmarks.fakes import FakeChatModel, LatencyEmbeddings, FakeDatabase, InMemoryGraph
+
+def use_corpus(corpus):
+    database = FakeDatabase(corpus)
+    vector_store.db = keyword_index.db = builder.db = question_router.db = database
+    # The summaries are an aggregation inside Mongo; the corpus already carries them
+    vector_store.refresh_sales_summaries = lambda full=False: None
+
+def use_fake_models(args):
+    vector_store._embeddings = CachedEmbeddings(
+        LatencyEmbeddings(args.embedding_dim, args.embed_ms / 1000), "benchmark-fake"
+    )
+    llm = FakeChatModel(first_token_seconds=args.llm_first_token_ms / 1000, token_seconds=args.llm_token_ms / 1000,
+                        completion_tokens=args.llm_tokens)
+    agent_graph.explain_chain = agent_graph.prompt | llm
+    agent_graph.summary_chain = agent_graph.summary_prompt | llm
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+async def bench_index_build(corpus):
+    records = sum(len(corpus.get(name, [])) for name in vector_store.COLLECTION_RENDERERS)
+    started = time.perf_counter()
+    vector_db = await vector_store.abuild_vector_db()
+    vector_seconds = time.perf_counter() - started
+    chunks = vector_db.ntotal
+    vector_db.close()
+
+    keyword_records = sum(len(corpus.get(name, [])) for name in keyword_index.KEYWORD_COLLECTIONS)
+    started = time.perf_counter()
+    await asyncio.to_thread(keyword_index.build_keyword_index)
+    keyword_seconds = time.perf_counter() - started
+    return {
+        "build_vector_db": {
+            "records": records, "chunks": chunks, "seconds": round(vector_seconds, 3),
+            "docs_per_sec": rate(records, vector_seconds), "chunks_per_sec": rate(chunks, vector_seconds)
+        },
+        "build_keyword_index": {
+            "records": keyword_records, "seconds": round(keyword_seconds, 3),
+            "docs_per_sec": rate(keyword_records, keyword_seconds)
+        }
+    }
+
+def bench_graph_build(graph):
+    builder.Neo4jConnection = lambda: graph
+    started = time.perf_counter()
+    builder.build_graph()
+    seconds = time.perf_counter() - started
+    rows = len(graph.products) + len(graph.shops) + sum(len(products) for products in graph.sells.values())
+    return {"rows": rows, "write_transactions": graph.writes, "seconds": round(seconds, 3),
+            "rows_per_sec": rate(rows, seconds)}
+
+async def wait_until_ready(timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        ready, components = agent_graph.readiness()
+        if ready:
+            return
+        failed = {name: status for name, status in components.items() if status["status"] == "failed"}
+        if failed:
+            raise RuntimeError(f"Backends failed to load: {failed}")
+        await asyncio.sleep(0.05)
+    raise TimeoutError("Backends did not become ready")
+
+async def load_test(client, questions, concurrency):
+    """POST every question to /ask from `concurrency` concurrent clients"""
+    pending = iter(questions)
+    latencies = []
+    errors = 0
+    cached = 0
+
+    async def client_loop():
+        nonlocal errors, cached
+        for question in pending:
+            started = time.perf_counter()
+            response = await client.post("/ask", json={"question": question})
+            latencies.append(time.perf_counter() - started)
+            body = response.json()
+            if response.status_code != 200 or "error" in body:
+                errors += 1
+            elif body.get("cached"):
+                cached += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "cached": cached,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+        "p90_ms": round(float(np.percentile(latencies_ms, 90)), 1),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1),
+        "mean_ms": round(float(latencies_ms.mean()), 1),
+        "throughput_rps": rate(len(latencies), elapsed)
+    }
+
+async def bench_ask(corpus, graph, args, scale):
+    for name in agent_graph.components:  # the previous scale's status must not count as ready
+        agent_graph.components[name] = {"status": "pending"}
+    agent_graph.neo4j.driver = graph.async_driver()
+    levels = []
+    async with main.lifespan(main.app):
+        await wait_until_ready()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            questions = make_questions(corpus, args.warmup + args.requests * len(args.concurrency), seed=int(scale * 1000))
+            await load_test(client, questions[:args.warmup], min(args.warmup, 4) or 1)
+            offset = args.warmup
+            for concurrency in args.concurrency:
+                result = await load_test(client, questions[offset:offset + args.requests], concurrency)
+                offset += args.requests
+                print(f"📊 scale {scale} /ask concurrency {concurrency}: p50 {result['p50_ms']} ms, "
+                      f"p99 {result['p99_ms']} ms, {result['throughput_rps']} req/s, {result['errors']} errors")
+                levels.append(result)
+    return levels
+
+async def bench_scale(scale, args):
+    corpus = make_corpus(scale, seed=args.seed)
+    use_corpus(corpus)
+    use_fake_models(args)
+    graph = InMemoryGraph(write_seconds=args.graph_write_ms / 1000, read_seconds=args.graph_read_ms / 1000)
+    result = {"scale": scale, "corpus": {name: len(records) for name, records in corpus.items()}}
+    result.update(await bench_index_build(corpus))
+    result["graph_build"] = await asyncio.to_thread(bench_graph_build, graph)
+    result["ask"] = await bench_ask(corpus, graph, args, scale)
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmarks(args):
+    scales = []
+    original_dir = os.getcwd()
+    for scale in args.scales:
+        # Indexes, caches and the data version all use relative paths: give each scale a scratch directory
+        with tempfile.TemporaryDirectory(prefix=f"benchmark-{scale}-") as scratch:
+            os.chdir(scratch)
+            try:
+                scales.append(await bench_scale(scale, args))
+            finally:
+                os.chdir(original_dir)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "scales": scales
+    }
+
+def compare(report, baseline, tolerance):
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    def check(name, current, previous, higher_is_better):
+        if current is None or not previous:
+            return
+        change = (current - previous) / previous
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append({"metric": name, "baseline": previous, "current": current,
+                                "change": round(change, 3)})
+
+    regressions = []
+    baseline_scales = {entry["scale"]: entry for entry in baseline["scales"]}
+    for entry in report["scales"]:
+        previous = baseline_scales.get(entry["scale"])
+        if previous is None:
+            continue
+        prefix = f"scale {entry['scale']}"
+        for stage, metric in (("build_vector_db", "docs_per_sec"), ("build_keyword_index", "docs_per_sec"),
+                              ("graph_build", "rows_per_sec")):
+            check(f"{prefix} {stage}.{metric}", entry[stage][metric], previous[stage][metric], True)
+        previous_levels = {level["concurrency"]: level for level in previous["ask"]}
+        for level in entry["ask"]:
+            base = previous_levels.get(level["concurrency"])
+            if base is not None:
+                name = f"{prefix} ask@{level['concurrency']}"
+                check(f"{name}.p50_ms", level["p50_ms"], base["p50_ms"], False)
+                check(f"{name}.p99_ms", level["p99_ms"], base["p99_ms"], False)
+                check(f"{name}.throughput_rps", level["throughput_rps"], base["throughput_rps"], True)
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the retrieval and answer pipeline")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10],
+                        help="corpus scale factors (1 = 200 products, 20 shops, 1000 invoice lines, 100 users)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="/ask requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=8, help="/ask requests before measuring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--embedding-dim", type=int, default=768)
+    parser.add_argument("--embed-ms", type=float, default=50, help="fake embedding latency per request")
+    parser.add_argument("--llm-first-token-ms", type=float, default=200)
+    parser.add_argument("--llm-token-ms", type=float, default=5)
+    parser.add_argument("--llm-tokens", type=int, default=40, help="completion tokens per answer")
+    parser.add_argument("--graph-read-ms", type=float, default=5, help="fake Neo4j latency per read query")
+    parser.add_argument("--graph-write-ms", type=float, default=10, help="fake Neo4j latency per write transaction")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing")
+    return parser.parse_args(argv)
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)  # per-request serving logs would drown the report
+    report = asyncio.run(run_benchmarks(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Benchmark written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression['metric']} {regression['baseline']} -> {regression['current']} "
+                  f"({regression['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main_cli()
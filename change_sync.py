@@ -0,0 +1,193 @@
+#change_sync.py
+# Long-running worker that tails Mongo change streams into FAISS, the keyword index and Neo4j.
+#
+# Change streams need a replica set; a local single-node one is enough:
+#   docker run -d --name mongo-rs -p 27017:27017 mongo:7 --replSet rs0 --bind_ip_all
+#   docker exec mongo-rs mongosh --eval 'rs.initiate()'
+#   python change_sync.py
+#
+# Run it instead of the update_vector_db.py job, not next to it: both publish
+# index generations derived from the current one.
+#
+# Invoice lines are not embedded themselves: a changed line recomputes its product
+# and shop summaries, and those sales_summaries writes come back through the same
+# stream to be embedded in a later batch; their recency windows are recomputed every
+# SALES_SUMMARY_DECAY_SECONDS as the batch job does. Summary writes whose rendered
+# text did not change (a $merge replace always rewrites updated_at) are dropped.
+#
+# Graph writes are applied per batch; vector and keyword changes are held back and
+# published together at most every CHANGE_SYNC_PUBLISH_SECONDS, since each publish
+# copies the whole current generation. The data version is only bumped when a
+# flush actually changed something the serving path reads.
+import os
+import time
+from bson import json_util
+from pymongo.errors import OperationFailure
+from config import (
+    db, CHANGE_SYNC_BATCH_SIZE, CHANGE_SYNC_FLUSH_SECONDS, CHANGE_SYNC_STATE_PATH, CHANGE_SYNC_PUBLISH_SECONDS
+)
+from data_version import bump_data_version
+from vector_store import (
+    COLLECTION_RENDERERS, document_key, document_hash, load_sync_state, current_generation_path,
+    migrate_legacy_index
+)
+from update_vector_db import update_vector_db, apply_vector_changes
+from graph_db.builder import Neo4jConnection, apply_graph_changes
+from sales_summary import SUMMARY_COLLECTION, names_by_kind, refresh_summaries, decay_summaries
+import keyword_index
+
+SYNC_COLLECTIONS = ["inventories", "shops", "invoiceitems", SUMMARY_COLLECTION]
+CHANGE_PIPELINE = [{"$match": {
+    "ns.coll": {"$in": SYNC_COLLECTIONS},
+    "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+}}]
+CHANGE_STREAM_HISTORY_LOST = 286  # resume token older than the oplog
+
+def load_resume_token(path=CHANGE_SYNC_STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json_util.loads(f.read())["resume_token"]
+
+def save_resume_token(token, path=CHANGE_SYNC_STATE_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(json_util.dumps({"resume_token": token, "saved_at": time.time()}))
+    os.replace(tmp_path, path)
+
+def coalesce(pending, change):
+    """Keep only the latest state per record: key -> full document, or None once deleted"""
+    key = document_key(change["ns"]["coll"], change["documentKey"]["_id"])
+    if change["operationType"] == "delete":
+        pending[key] = None
+    elif change.get("fullDocument") is not None:
+        pending[key] = change["fullDocument"]
+    # A null fullDocument means the record was deleted before the lookup; its delete event follows
+
+def unchanged_summary(change, sync_state, queued):
+    """A sales_summaries write that renders exactly like the published copy (and nothing newer is queued)"""
+    if change["ns"]["coll"] != SUMMARY_COLLECTION or change.get("fullDocument") is None:
+        return False
+    key = document_key(SUMMARY_COLLECTION, change["documentKey"]["_id"])
+    if any(key in changes for changes in queued):
+        return False
+    document = COLLECTION_RENDERERS[SUMMARY_COLLECTION][1](change["fullDocument"])
+    return sync_state.get(key, {}).get("hash") == document_hash(document)
+
+def apply_changes(neo4j, pending, backlog):
+    """Apply one coalesced batch to the graph and the sales summaries, and queue its rendered
+    documents in `backlog` (key -> Document, or None once deleted) for the next publish.
+    Returns whether the graph changed."""
+    started = time.monotonic()
+    upserts = {collection_name: [] for collection_name in SYNC_COLLECTIONS}
+    deletes = {collection_name: [] for collection_name in SYNC_COLLECTIONS}
+    for key, record in pending.items():
+        collection_name, mongo_id = key.split(":", 1)
+        if record is None:
+            deletes[collection_name].append(mongo_id)
+        else:
+            upserts[collection_name].append(record)
+
+    for collection_name, records in upserts.items():
+        if collection_name in COLLECTION_RENDERERS:
+            for record in records:
+                backlog[document_key(collection_name, record["_id"])] = COLLECTION_RENDERERS[collection_name][1](record)
+    for collection_name, mongo_ids in deletes.items():
+        if collection_name in COLLECTION_RENDERERS:
+            for mongo_id in mongo_ids:
+                backlog[document_key(collection_name, mongo_id)] = None
+
+    graph_changed = apply_graph_changes(neo4j, upserts, deletes)
+    # Deleted lines carry no names; the next full build reconciles their summaries
+    summaries = refresh_summaries(names_by_kind(upserts["invoiceitems"]))
+    print(f"🔁 Applied {len(pending)} changed records ({len(backlog)} queued for the next publish, "
+          f"{summaries} sales summaries recomputed) in {time.monotonic() - started:.1f}s")
+    return graph_changed
+
+def current_sync_state():
+    source = current_generation_path()
+    sync_state = load_sync_state(source) if source else None
+    if sync_state is None:
+        raise RuntimeError("No vector index generation to sync into; run `python vector_store.py` first")
+    return source, sync_state
+
+def publish_changes(backlog, graph_changed):
+    """Write the queued documents to the vector index and the keyword delta log, then bump the
+    data version if the indexes or the graph changed. Returns the published sync state."""
+    source, sync_state = current_sync_state()
+    # Updates to fields the renderers don't use (e.g. timestamps) produce no re-embedding
+    changed = [(key, document) for key, document in backlog.items()
+               if document is not None and sync_state.get(key, {}).get("hash") != document_hash(document)]
+    deleted = [key for key, document in backlog.items() if document is None and key in sync_state]
+
+    keyword_rows = keyword_index.apply_changes(changed, deleted)
+    generation = apply_vector_changes(source, sync_state, changed, deleted)
+    if generation or keyword_rows or graph_changed:
+        bump_data_version()
+    print(f"🔁 Published {len(backlog)} queued records ({len(changed)} re-embedded, {len(deleted)} deleted)"
+          + (f" as generation {generation}" if generation else ""))
+    return sync_state
+
+def open_stream(resume_token):
+    options = {"full_document": "updateLookup", "max_await_time_ms": 1000}
+    if resume_token is not None:
+        options["resume_after"] = resume_token
+    return db.watch(CHANGE_PIPELINE, **options)
+
+def run(batch_size=CHANGE_SYNC_BATCH_SIZE, flush_seconds=CHANGE_SYNC_FLUSH_SECONDS,
+        publish_seconds=CHANGE_SYNC_PUBLISH_SECONDS):
+    """Tail the change streams forever, applying coalesced batches and checkpointing the resume token.
+
+    The token is only saved once its changes have been applied and published,
+    so a crash replays (idempotently) rather than skips changes.
+    """
+    migrate_legacy_index()
+    neo4j = Neo4jConnection()
+    token = load_resume_token()
+    try:
+        stream = open_stream(token)
+    except OperationFailure as e:
+        if e.code != CHANGE_STREAM_HISTORY_LOST:
+            raise
+        print("🟡 Resume token is older than the oplog; starting from now")
+        token = None
+        stream = open_stream(None)
+
+    with stream:
+        if token is None:
+            # The stream is already open, so nothing that changes during the catch-up is missed
+            print("🟡 No resume token; catching up the vector index with a full incremental sync "
+                  "(run graph_db/builder.py once if the graph is stale too)")
+            update_vector_db()
+        _, sync_state = current_sync_state()
+        print(f"👀 Watching {', '.join(SYNC_COLLECTIONS)} for changes...")
+
+        pending, backlog = {}, {}
+        deadline = None
+        graph_changed = False
+        next_publish = next_decay = 0.0
+        saved_token = token
+        while stream.alive:
+            change = stream.try_next()
+            if change is not None and not unchanged_summary(change, sync_state, (pending, backlog)):
+                coalesce(pending, change)
+                deadline = deadline or time.monotonic() + flush_seconds
+            if time.monotonic() >= next_decay:
+                decayed = decay_summaries()  # its writes come back through the stream
+                if decayed:
+                    print(f"📈 Sales summaries: {decayed} recomputed as their recency windows moved")
+                next_decay = time.monotonic() + publish_seconds
+            if pending and (len(pending) >= batch_size or time.monotonic() >= deadline):
+                graph_changed = apply_changes(neo4j, pending, backlog) or graph_changed
+                pending, deadline = {}, None
+            if not pending and (backlog or graph_changed) and time.monotonic() >= next_publish:
+                sync_state = publish_changes(backlog, graph_changed)
+                backlog, graph_changed = {}, False
+                next_publish = time.monotonic() + publish_seconds
+            idle = not pending and not backlog and not graph_changed
+            if idle and stream.resume_token is not None and stream.resume_token != saved_token:
+                save_resume_token(stream.resume_token)
+                saved_token = stream.resume_token
+
+if __name__ == "__main__":
+    run()
@@ -17,4 +17,100 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # Neo4j Config
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j+s://95c3c773.databases.neo4j.io")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "06OB6VgQQ7Fu8EU92d-wc0DYORDUctT9ZreYdNstfeY")
\ No newline at end of file
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "06OB6VgQQ7Fu8EU92d-wc0DYORDUctT9ZreYdNstfeY")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")  # named explicitly to skip home-database resolution
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "2.0"))  # wait for a free pooled connection
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5.0"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1800"))  # under AuraDB's idle cutoff
+NEO4J_QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", "2.0"))  # server-side transaction timeout
+
+# Graph result cache (graph_cache.py); cleared whenever the data version is bumped
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", "300"))
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", "1000"))
+
+# Retrieval branch timeouts (seconds); a late branch contributes no results
+SEMANTIC_TIMEOUT = float(os.getenv("SEMANTIC_TIMEOUT", "3.0"))
+KEYWORD_TIMEOUT = float(os.getenv("KEYWORD_TIMEOUT", "1.0"))
+GRAPH_TIMEOUT = float(os.getenv("GRAPH_TIMEOUT", "2.0"))
+
+# Semantic answer cache (cosine similarity threshold, TTL in seconds, max entries)
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+# Touched by the index/graph build jobs so serving caches know to invalidate
+DATA_VERSION_PATH = os.getenv("DATA_VERSION_PATH", ".data_version")
+
+# Embedding cache: in-process LRU for query vectors, shared on-disk store for everything
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "2048"))
+EMBEDDING_DISK_CACHE_MAX = int(os.getenv("EMBEDDING_DISK_CACHE_MAX", "500000"))
+
+# Index build embedding pipeline
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # chunks per embedding request
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))  # embedding requests in flight
+EMBED_REQUESTS_PER_MINUTE = float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "1500"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_SECONDS = float(os.getenv("EMBED_BACKOFF_SECONDS", "1.0"))
+STREAM_QUEUE_BATCHES = int(os.getenv("STREAM_QUEUE_BATCHES", "16"))  # rendered batches buffered ahead of embedding
+STREAM_PROGRESS_EVERY = int(os.getenv("STREAM_PROGRESS_EVERY", "1000"))  # records between progress lines
+
+# Vector index type: flat (exact), hnsw, ivf_pq or ivf_sq8; see `python ann_index.py` for a recall/latency benchmark
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat")
+ANN_TRAIN_SAMPLE = int(os.getenv("ANN_TRAIN_SAMPLE", "50000"))  # vectors sampled to train IVF indexes
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "10000"))  # smaller partitions stay flat (exact and fast enough)
+ANN_TOMBSTONE_RATIO = float(os.getenv("ANN_TOMBSTONE_RATIO", "0.2"))  # deleted share of an ANN index before it is rebuilt
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = derive from the vector count
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("PQ_M", "48"))  # PQ sub-quantizers; must divide the embedding dimension
+
+# Index generations: serving processes check for a newly published generation every INDEX_WATCH_SECONDS
+INDEX_WATCH_SECONDS = float(os.getenv("INDEX_WATCH_SECONDS", "5"))
+INDEX_GENERATIONS_KEEP = int(os.getenv("INDEX_GENERATIONS_KEEP", "3"))
+
+# Backends that failed (or were missing) at startup are retried from the watcher loop with exponential backoff
+BACKEND_RETRY_SECONDS = float(os.getenv("BACKEND_RETRY_SECONDS", "5"))  # first retry delay
+BACKEND_RETRY_MAX_SECONDS = float(os.getenv("BACKEND_RETRY_MAX_SECONDS", "300"))  # backoff cap
+
+# SQLite docstore: bytes of the file each reader memory-maps
+DOCSTORE_MMAP_BYTES = int(os.getenv("DOCSTORE_MMAP_BYTES", str(1 << 30)))
+
+# Query micro-batching: concurrent questions arriving within the window share one embedding call and one FAISS search
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "64"))
+
+# Change-stream sync worker (change_sync.py); needs Mongo running as a replica set
+CHANGE_SYNC_BATCH_SIZE = int(os.getenv("CHANGE_SYNC_BATCH_SIZE", "500"))  # distinct records per applied batch
+CHANGE_SYNC_FLUSH_SECONDS = float(os.getenv("CHANGE_SYNC_FLUSH_SECONDS", "10"))  # max wait before applying a batch
+CHANGE_SYNC_STATE_PATH = os.getenv("CHANGE_SYNC_STATE_PATH", "change_sync_state.json")  # resume token
+CHANGE_SYNC_PUBLISH_SECONDS = float(os.getenv("CHANGE_SYNC_PUBLISH_SECONDS", "60"))  # min interval between index generations
+KEYWORD_DELTA_MAX_LINES = int(os.getenv("KEYWORD_DELTA_MAX_LINES", "5000"))  # keyword delta log size before it is folded in
+
+# Conversation memory per session_id (session_memory.py); set SESSION_REDIS_URL to share it between workers
+SESSION_WINDOW_TURNS = int(os.getenv("SESSION_WINDOW_TURNS", "4"))  # recent turns kept verbatim
+SESSION_TURN_CHARS = int(os.getenv("SESSION_TURN_CHARS", "800"))  # stored answer length per turn
+SESSION_SUMMARY_CHARS = int(os.getenv("SESSION_SUMMARY_CHARS", "1200"))  # running summary of older turns
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))  # in-memory store only
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "")
+
+# Serving logs: one structured (JSON) line per event, tagged with the request id
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_JSON = os.getenv("LOG_JSON", "true").lower() == "true"  # false: plain `key=value` lines for local runs
+
+# Sales summaries (sales_summary.py): invoice lines are aggregated per product and per shop before indexing
+SALES_SUMMARY_WINDOWS_DAYS = [int(days) for days in os.getenv("SALES_SUMMARY_WINDOWS_DAYS", "7,30,90").split(",")]
+SALES_SUMMARY_TOP = int(os.getenv("SALES_SUMMARY_TOP", "3"))  # top shops per product / products per shop
+SALES_SUMMARY_LOOKBACK_SECONDS = float(os.getenv("SALES_SUMMARY_LOOKBACK_SECONDS", "300"))  # re-scan margin for late lines
+SALES_SUMMARY_DECAY_SECONDS = float(os.getenv("SALES_SUMMARY_DECAY_SECONDS", "3600"))  # recency window refresh interval
+
+# Question router (question_router.py): only the retrieval branches a question needs run
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.6"))  # below this every branch runs
+ROUTER_ENTITY_COVERAGE = float(os.getenv("ROUTER_ENTITY_COVERAGE", "0.75"))  # share of a catalogue name's words to count as named
+
+# Templated answers for unambiguous product/shop lookups (fast_answers.py); false: every answer comes from the LLM
+FAST_ANSWERS_ENABLED = os.getenv("FAST_ANSWERS_ENABLED", "true").lower() == "true"
@@ -0,0 +1,23 @@
+#data_version.py
+import os
+import time
+from config import DATA_VERSION_PATH
+
+def bump_data_version():
+    """Mark the derived stores (FAISS index, Neo4j graph) as rewritten.
+
+    Caches in the serving processes compare `current_data_version()` on each
+    lookup and drop their entries when it changes.
+    """
+    tmp_path = f"{DATA_VERSION_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, DATA_VERSION_PATH)
+
+def current_data_version():
+    """Cheap stat-based token; changes every time `bump_data_version` runs"""
+    try:
+        stat = os.stat(DATA_VERSION_PATH)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
@@ -0,0 +1,105 @@
+#doc_store.py
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain.docstore.document import Document
+from config import DOCSTORE_MMAP_BYTES
+
+DOCSTORE_FILE = "docstore.sqlite"
+
+class SqliteDocstore(Docstore, AddableMixin):
+    """Docstore kept in SQLite instead of a pickled dict.
+
+    Readers open the file read-only with `PRAGMA mmap_size`, so pages come
+    from the OS page cache shared by every worker and a Document is only
+    built for the ids a search actually returns. Each thread gets its own
+    connection because LangChain runs FAISS searches on executor threads.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._connections = []  # every thread's connection, so close() can release them all
+        self._connections_lock = threading.Lock()
+        if not readonly:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, page_content TEXT, metadata TEXT);
+                CREATE TABLE IF NOT EXISTS positions (position INTEGER PRIMARY KEY, id TEXT NOT NULL);
+            """)
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path)
+            conn.execute(f"PRAGMA mmap_size={DOCSTORE_MMAP_BYTES}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def search(self, search):
+        row = self._conn.execute("SELECT page_content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts):
+        self._conn.executemany(
+            "INSERT INTO docs (id, page_content, metadata) VALUES (?, ?, ?)",
+            [(doc_id, doc.page_content, json.dumps(doc.metadata, default=str)) for doc_id, doc in texts.items()]
+        )
+
+    def delete(self, ids):
+        self._conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def write_positions(self, index_to_docstore_id):
+        """Persist FAISS vector position -> docstore id"""
+        self._conn.execute("DELETE FROM positions")
+        self._conn.executemany("INSERT INTO positions (position, id) VALUES (?, ?)", index_to_docstore_id.items())
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        """Close every thread's connection; only call once no search is using this store"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+class SqliteIndexMap(Mapping):
+    """Read-only FAISS position -> docstore id mapping, looked up per hit instead of loaded whole"""
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+        self._len = None
+
+    def __getitem__(self, position):
+        row = self.docstore._conn.execute("SELECT id FROM positions WHERE position = ?", (int(position),)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __len__(self):
+        if self._len is None:  # the file is never written while it is mapped read-only; count it once
+            self._len = self.docstore._conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        return self._len
+
+    def __iter__(self):
+        return (row[0] for row in self.docstore._conn.execute("SELECT position FROM positions ORDER BY position"))
+
+    def to_dict(self):
+        """Materialise the mapping for writers (build/sync), which mutate it"""
+        return dict(self.docstore._conn.execute("SELECT position, id FROM positions"))
+
+def docstore_path(directory):
+    return os.path.join(directory, DOCSTORE_FILE)
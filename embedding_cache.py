@@ -0,0 +1,291 @@
+#embedding_cache.py
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from config import EMBEDDING_CACHE_DIR, EMBEDDING_QUERY_CACHE_SIZE, EMBEDDING_DISK_CACHE_MAX
+
+def as_float32(vectors):
+    """Round fresh vectors the same way stored ones are, so cached and uncached results match"""
+    return np.asarray(vectors, dtype=np.float32).tolist()
+
+class DiskEmbeddingStore:
+    """Persistent embedding store shared by the build, update and serving processes.
+
+    Vectors are appended to `vectors.f32` (read through a memory map) and their
+    content hashes to `keys.txt`, one per line, so row N of one file belongs to
+    line N of the other. Writers hold an exclusive flock and readers a shared
+    one, so nobody maps the files halfway through another process's compaction;
+    readers pick up rows appended by other processes whenever they miss. When
+    `max_entries` is exceeded the oldest half is dropped and `meta.json`'s
+    generation is bumped so readers reload from scratch.
+
+    Every method blocks on file I/O and the flock: async callers run them in a thread.
+    """
+
+    def __init__(self, directory, max_entries=EMBEDDING_DISK_CACHE_MAX):
+        os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.txt")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, ".lock")
+        self._thread_lock = threading.RLock()  # the index is shared by this process's threads
+        self._reset(generation=None)
+        self.refresh()
+
+    def _reset(self, generation):
+        self.index = {}  # content hash -> row
+        self.rows = 0
+        self.dim = None
+        self.generation = generation
+        self._keys_offset = 0
+        self._vectors = None
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dim": None, "generation": 0}
+
+    def _write_meta(self, meta):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    @contextmanager
+    def _locked(self, mode=fcntl.LOCK_EX):
+        with self._thread_lock, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Index any rows written since the last refresh (by this or another process)"""
+        with self._locked(fcntl.LOCK_SH):
+            self._refresh()
+
+    def _refresh(self):
+        """refresh() for callers that already hold the flock"""
+        meta = self._read_meta()
+        if meta["generation"] != self.generation:
+            self._reset(meta["generation"])
+        self.dim = meta["dim"]
+        if not os.path.exists(self.keys_path):
+            return
+
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # a writer may be mid-line
+        if not complete:
+            return
+        for line in complete.decode().splitlines():
+            self.index[line] = self.rows
+            self.rows += 1
+        self._keys_offset += len(complete)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+
+    def get_many(self, keys):
+        with self._thread_lock:
+            if any(key not in self.index for key in keys):
+                self.refresh()
+            return {
+                key: self._vectors[self.index[key]].tolist()
+                for key in keys if key in self.index
+            }
+
+    def put_many(self, items):
+        """Persist (key, vector) pairs not already stored"""
+        if not items:
+            return
+        with self._locked():
+            self._refresh()
+            new_items = {key: vector for key, vector in items if key not in self.index}
+            if not new_items:
+                return
+            if len(new_items) > self.max_entries:
+                new_items = dict(list(new_items.items())[-self.max_entries:])
+            if self.rows + len(new_items) > self.max_entries:
+                self._compact(keep=max(self.max_entries // 2 - len(new_items), 0))
+
+            vectors = np.asarray(list(new_items.values()), dtype=np.float32)
+            if self.dim is None:
+                self._write_meta({"dim": int(vectors.shape[1]), "generation": self.generation or 0})
+            # Drop what an interrupted write left past the last complete key line, or later rows would shift
+            self._truncate(self.vectors_path, self.rows * vectors.shape[1] * vectors.itemsize)
+            self._truncate(self.keys_path, self._keys_offset)
+            # Vectors first: a reader only trusts rows whose key line is complete
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.keys_path, "a") as f:
+                f.write("".join(f"{key}\n" for key in new_items))
+            self._refresh()
+
+    @staticmethod
+    def _truncate(path, size):
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _compact(self, keep):
+        """Keep only the newest `keep` rows; caller holds the lock"""
+        start = self.rows - keep
+        keys = sorted(self.index, key=self.index.get)[start:] if keep else []
+        vectors = np.array(self._vectors[start:]) if keep else np.empty((0, self.dim or 0), dtype=np.float32)
+        for path, payload in ((self.vectors_path, vectors.tobytes()),
+                              (self.keys_path, "".join(f"{key}\n" for key in keys).encode())):
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(payload)
+            os.replace(f"{path}.tmp", path)
+        self._write_meta({"dim": self.dim, "generation": (self.generation or 0) + 1})
+        self._refresh()
+
+    def __len__(self):
+        return self.rows
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings client with an in-process LRU for queries and a shared on-disk store.
+
+    Keys are the SHA-256 of model name, kind (query/document) and text, so the
+    same chunk is only embedded once across rebuilds and processes.
+    """
+
+    def __init__(self, underlying, model, store=None, query_cache_size=EMBEDDING_QUERY_CACHE_SIZE):
+        self.underlying = underlying
+        self.model = model
+        self.store = store if store is not None else DiskEmbeddingStore(
+            os.path.join(EMBEDDING_CACHE_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        )
+        self.query_cache_size = query_cache_size
+        self.query_cache = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, kind, text):
+        return hashlib.sha256(f"{self.model}\0{kind}\0{text}".encode()).hexdigest()
+
+    def _remember_query(self, key, vector):
+        self.query_cache[key] = vector
+        self.query_cache.move_to_end(key)
+        while len(self.query_cache) > self.query_cache_size:
+            self.query_cache.popitem(last=False)
+
+    def _memory_query(self, key):
+        if key in self.query_cache:
+            self.query_cache.move_to_end(key)
+            self.memory_hits += 1
+            return self.query_cache[key]
+        return None
+
+    def _disk_queries(self, found):
+        for key, vector in found.items():
+            self.disk_hits += 1
+            self._remember_query(key, vector)
+        return found
+
+    def _cached_query(self, key):
+        vector = self._memory_query(key)
+        if vector is None:
+            vector = self._disk_queries(self.store.get_many([key])).get(key)
+        return vector
+
+    async def _acached_queries(self, keys):
+        """Memory hits on the loop; the rest from the disk store in a thread (it may wait on the flock)"""
+        vectors = [self._memory_query(key) for key in keys]
+        missing = [key for key, vector in zip(keys, vectors) if vector is None]
+        if missing:
+            found = self._disk_queries(await asyncio.to_thread(self.store.get_many, missing))
+            vectors = [found.get(key) if vector is None else vector for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def _lookup_documents(self, texts):
+        keys = [self._key("document", text) for text in texts]
+        found = self.store.get_many(keys)
+        self.disk_hits += len(found)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _store_documents(self, keys, found, missing, vectors):
+        vectors = as_float32(vectors)
+        self.store.put_many([(keys[i], vector) for i, vector in zip(missing, vectors)])
+        for i, vector in zip(missing, vectors):
+            found[keys[i]] = vector
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._lookup_documents(texts)
+        vectors = self.underlying.embed_documents([texts[i] for i in missing]) if missing else []
+        return self._store_documents(keys, found, missing, vectors)
+
+    async def aembed_documents(self, texts):
+        keys, found, missing = await asyncio.to_thread(self._lookup_documents, texts)
+        vectors = await self.underlying.aembed_documents([texts[i] for i in missing]) if missing else []
+        return await asyncio.to_thread(self._store_documents, keys, found, missing, vectors)
+
+    def embed_query(self, text):
+        key = self._key("query", text)
+        vector = self._cached_query(key)
+        if vector is None:
+            self.misses += 1
+            vector = as_float32([self.underlying.embed_query(text)])[0]
+            self.store.put_many([(key, vector)])
+            self._remember_query(key, vector)
+        return vector
+
+    async def aembed_query(self, text):
+        key = self._key("query", text)
+        vector = (await self._acached_queries([key]))[0]
+        if vector is None:
+            self.misses += 1
+            vector = as_float32([await self.underlying.aembed_query(text)])[0]
+            self._remember_query(key, vector)
+            await asyncio.to_thread(self.store.put_many, [(key, vector)])
+        return vector
+
+    async def _aembed_query_batch(self, texts):
+        if isinstance(self.underlying, GoogleGenerativeAIEmbeddings):
+            # One batched request, embedded the way aembed_query would embed each question
+            return await self.underlying.aembed_documents(texts, task_type="retrieval_query")
+        return await asyncio.gather(*(self.underlying.aembed_query(text) for text in texts))
+
+    async def aembed_queries(self, texts):
+        """Embed several questions, sending every cache miss in a single call"""
+        keys = [self._key("query", text) for text in texts]
+        vectors = await self._acached_queries(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            self.misses += len(missing)
+            fresh = as_float32(await self._aembed_query_batch([texts[i] for i in missing]))
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+                self._remember_query(keys[i], vector)
+            await asyncio.to_thread(self.store.put_many, [(keys[i], vector) for i, vector in zip(missing, fresh)])
+        return vectors
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model,
+            "memory_entries": len(self.query_cache),
+            "memory_max_entries": self.query_cache_size,
+            "disk_entries": len(self.store),
+            "disk_max_entries": self.store.max_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,127 @@
+#embedding_pipeline.py
+import asyncio
+import random
+import time
+from itertools import islice
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from config import (
+    EMBED_BATCH_SIZE, EMBED_CONCURRENCY, EMBED_REQUESTS_PER_MINUTE,
+    EMBED_MAX_RETRIES, EMBED_BACKOFF_SECONDS
+)
+
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+
+class RateLimiter:
+    """Spaces request starts evenly so we stay under the API's requests-per-minute quota"""
+
+    def __init__(self, requests_per_minute=EMBED_REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class Progress:
+    def __init__(self, total=None, label="chunks"):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def update(self, count):
+        self.done += count
+        now = time.monotonic()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            rate = self.done / max(now - self.started, 1e-9)
+            of_total = f"/{self.total}" if self.total is not None else ""
+            print(f"⏳ Embedded {self.done}{of_total} {self.label} ({rate:.1f} {self.label}/s)")
+
+    def finish(self):
+        elapsed = time.monotonic() - self.started
+        print(f"✅ Embedded {self.done} {self.label} in {elapsed:.1f}s ({self.done / max(elapsed, 1e-9):.1f} {self.label}/s)")
+
+def batched(iterable, size=EMBED_BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+async def iterate_async(iterable):
+    for item in iterable:
+        yield item
+
+async def embed_with_retry(embeddings, texts, limiter, max_retries=EMBED_MAX_RETRIES, backoff=EMBED_BACKOFF_SECONDS):
+    for attempt in range(max_retries + 1):
+        await limiter.wait()
+        try:
+            return await embeddings.aembed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random())
+            print(f"⚠️ Embedding batch of {len(texts)} failed ({e}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+def in_memory_store(embeddings):
+    return lambda dim: FAISS(embeddings, faiss.IndexFlatL2(dim), InMemoryDocstore(), {})
+
+async def embed_into_index(batches, embeddings, vector_db=None, new_store=None, concurrency=EMBED_CONCURRENCY, total=None):
+    """Embed (chunk, id) batches concurrently and add each to the FAISS index as it completes.
+
+    `batches` may be a plain or an async iterable; it is only pulled when a
+    request slot is free, so a streaming source sees backpressure.
+
+    At most `concurrency` requests are in flight; request starts are rate
+    limited and failed batches are retried with exponential backoff. When
+    `vector_db` is None, `new_store(dim)` creates the store once the first
+    batch tells us the dimension (default: in-memory). Returns the store.
+    """
+    new_store = new_store or in_memory_store(embeddings)
+    limiter = RateLimiter()
+    slots = asyncio.Semaphore(concurrency)
+    progress = Progress(total)
+    holder = {"vector_db": vector_db}
+    failures = []
+
+    async def run(chunks, ids):
+        try:
+            texts = [chunk.page_content for chunk in chunks]
+            vectors = await embed_with_retry(embeddings, texts, limiter)
+            text_embeddings = list(zip(texts, vectors))
+            metadatas = [chunk.metadata for chunk in chunks]
+            if holder["vector_db"] is None:
+                holder["vector_db"] = new_store(len(vectors[0]))
+            holder["vector_db"].add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            progress.update(len(chunks))
+        except Exception as e:
+            failures.append(e)
+        finally:
+            slots.release()
+
+    if not hasattr(batches, "__aiter__"):
+        batches = iterate_async(batches)
+
+    tasks = set()
+    async for batch in batches:
+        await slots.acquire()
+        if failures:
+            break
+        chunks, ids = zip(*batch)
+        task = asyncio.create_task(run(list(chunks), list(ids)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+
+    if failures:
+        raise failures[0]
+    progress.finish()
+    return holder["vector_db"]
@@ -0,0 +1,143 @@
+#fast_answers.py
+# Deterministic answers for direct lookups ("what is the price of X", "phone number of
+# shop Y"): when the router named exactly one catalogue product/shop and the graph
+# returned it with every field the answer needs, explain_step renders this Markdown
+# template instead of calling the LLM. Anything less certain goes to the LLM as before.
+import threading
+from langchain_core.messages import AIMessage
+from graph_db.queries import STOP_WORDS
+from question_router import tokenize
+from metrics import FAST_ANSWERS
+
+SUPPORT_CONTACT = "077-6694351"  # same number the explain prompt gives for missing data
+MAX_LISTED = 5
+
+# Words a template fully answers, per intent; any other content word in the question goes to the LLM
+ANSWERED_WORDS = {
+    "product": {"price", "prices", "cost", "costs", "discount", "discounted", "offer", "offers", "stock",
+                "available", "availability", "quantity", "sell", "sells", "buy", "product", "shop", "shops",
+                "store", "stores", "where", "get"},
+    "shop": {"shop", "store", "address", "location", "located", "where", "phone", "contact", "number",
+             "call", "products", "sell", "sells", "details"},
+}
+QUESTION_WORDS = {"many", "current", "currently", "now", "today", "there", "its", "their", "whats",
+                  "know", "want", "need", "find", "give", "s"}
+# intent -> (graph record key, fields that must be present)
+REQUIRED_FIELDS = {"product": ("p", ("name", "price", "discount_price", "quantity")),
+                   "shop": ("s", ("name", "address", "phone"))}
+
+def format_price(value):
+    """1,500 LKR style; decimals only when the price has them"""
+    value = float(value)
+    return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+
+def render_product(product):
+    name = product["name"]
+    price = float(product["price"])
+    offer = float(product["discount_price"])
+    if 0 < offer < price:
+        headline = (f"**{name}** is on offer at **{format_price(offer)} LKR** "
+                    f"(regular price {format_price(price)} LKR, you save {format_price(price - offer)} LKR).")
+    else:
+        headline = f"**{name}** costs **{format_price(price)} LKR**."
+    quantity = int(product["quantity"])
+    lines = [headline, "", "---", "", f"- **Price:** {format_price(price)} LKR"]
+    if 0 < offer < price:
+        lines.append(f"- **Offer price:** {format_price(offer)} LKR")
+    lines.append(f"- **Availability:** In stock (**{quantity}** units)" if quantity > 0 else
+                 "- **Availability:** **Out of stock**")
+
+    shops = product.get("available_at") or []
+    lines += ["", "---", "", "**Available at:**"]
+    if shops:
+        lines += [f"- **{shop.get('name')}** — {shop.get('address') or 'address N/A'}, "
+                  f"phone {shop.get('phone') or 'N/A'}" for shop in shops[:MAX_LISTED]]
+    else:
+        lines.append(f"- No shop is listed yet. Please contact {SUPPORT_CONTACT} for availability.")
+    related = [item for item in product.get("related") or [] if item.get("name")]
+    if related:
+        listed = ", ".join(f"**{item['name']}** ({format_price(item['price'])} LKR)" if item.get("price") is not None
+                           else f"**{item['name']}**" for item in related[:MAX_LISTED])
+        lines += ["", f"**Related:** {listed}"]
+    return "\n".join(lines)
+
+def render_shop(shop):
+    lines = [
+        f"**{shop['name']}** is at **{shop['address']}**; call them on **{shop['phone']}**.",
+        "", "---", "",
+        f"- **Address:** {shop['address']}",
+        f"- **Phone:** {shop['phone']}"
+    ]
+    products = [product for product in shop.get("products") or [] if product.get("name")]
+    if products:
+        lines += ["", "---", "", "**Products:**"]
+        lines += [f"- **{product['name']}** — {format_price(product['price'])} LKR" if product.get("price") is not None
+                  else f"- **{product['name']}**" for product in products[:MAX_LISTED]]
+    return "\n".join(lines)
+
+RENDERERS = {"product": render_product, "shop": render_shop}
+
+def complete(record, fields):
+    return all(record.get(field) not in (None, "") for field in fields)
+
+class FastAnswers:
+    """Decides whether a routed lookup can skip the LLM and counts how often it does"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.outcomes = {}  # "answered" or the reason the LLM was needed -> questions
+
+    def _count(self, intent, outcome):
+        FAST_ANSWERS.labels(intent, outcome).inc()
+        with self.lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def _decline(self, state):
+        """(reason, None) when the LLM is needed, else (None, graph record to render)"""
+        intent = state.get("intent")
+        entities = state.get("entities") or {}
+        named = entities.get(intent) or []
+        exact = [entity for entity in named if entity.get("exact")]
+        other = "shop" if intent == "product" else "product"
+        if not exact:
+            return "no_entity", None
+        if len(exact) > 1 or entities.get(other):
+            return "ambiguous", None
+        if exact[0].get("duplicate"):
+            return "ambiguous", None  # several catalogue records share the name; the graph keeps only one
+        name = exact[0]["name"]
+        words = set(tokenize(state["question"])) - STOP_WORDS - QUESTION_WORDS - ANSWERED_WORDS[intent]
+        if words - set(tokenize(name)):
+            return "open_question", None  # asks for something the template does not cover
+        key, fields = REQUIRED_FIELDS[intent]
+        records = [record[key] for record in state.get("graph_records") or []
+                   if key in record and record[key].get("name") == name]
+        if not records:
+            return "no_graph_match", None
+        if not complete(records[0], fields):
+            return "incomplete", None
+        return None, records[0]
+
+    def answer(self, state):
+        """A templated AIMessage for an unambiguous product/shop lookup, or None to use the LLM"""
+        intent = state.get("intent")
+        if not self.enabled or intent not in RENDERERS or not state.get("routed"):
+            return None
+        reason, record = self._decline(state)
+        if reason is not None:
+            self._count(intent, reason)
+            return None
+        self._count(intent, "answered")
+        return AIMessage(content=RENDERERS[intent](record), response_metadata={"fast_path": intent})
+
+    def stats(self):
+        with self.lock:
+            eligible = sum(self.outcomes.values())
+            return {
+                "enabled": self.enabled,
+                "eligible": eligible,
+                "answered": self.outcomes.get("answered", 0),
+                "hit_rate": self.outcomes.get("answered", 0) / eligible if eligible else 0.0,
+                "declined": {reason: count for reason, count in self.outcomes.items() if reason != "answered"}
+            }
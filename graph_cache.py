@@ -0,0 +1,95 @@
+#graph_cache.py
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from config import GRAPH_CACHE_TTL, GRAPH_CACHE_SIZE
+from data_version import current_data_version
+
+class GraphResultCache:
+    """Neo4j results keyed by query name and parameters.
+
+    Entries expire after `ttl` seconds and the least recently used one is
+    evicted past `max_size`. The graph builder and the change-stream worker
+    bump the data version after writing, which clears the cache in every
+    serving process; `invalidate()` is the in-process hook. Concurrent misses
+    for the same key share one round trip.
+    """
+
+    def __init__(self, ttl=GRAPH_CACHE_TTL, max_size=GRAPH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()  # (name, params json) -> (results, stored_at)
+        self._inflight = {}  # key -> Task
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # misses that waited on another caller's in-flight query
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = current_data_version()
+
+    @staticmethod
+    def _key(name, params):
+        return name, json.dumps(params or {}, sort_keys=True, default=str)
+
+    def _check_version(self):
+        version = current_data_version()
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+    def invalidate(self, name=None):
+        """Drop every entry, or only those of query `name`"""
+        keys = [key for key in self.entries if name is None or key[0] == name]
+        for key in keys:
+            del self.entries[key]
+        if keys:
+            self.invalidations += 1
+
+    async def get_or_fetch(self, name, params, fetch):
+        """Cached results for (name, params), else `await fetch()` and remember them"""
+        self._check_version()
+        key = self._key(name, params)
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            version = self._version
+            # Stored from the task itself, so results still land if every caller timed out meanwhile
+            task.add_done_callback(lambda done: self._finish(key, version, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, version, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return  # exception() also marks it retrieved when no caller is left waiting
+        if version == self._version:  # don't store results fetched across an invalidation
+            self.entries[key] = (task.result(), time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
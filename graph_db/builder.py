@@ -1,9 +1,16 @@
 import os
 import sys
+import time
+from itertools import islice
 from neo4j import GraphDatabase
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
+# Allow `python graph_db/builder.py` as well as `python -m graph_db.builder`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_version import bump_data_version
+from graph_db.queries import FULLTEXT_INDEX_QUERIES
+
 # Load environment variables
 load_dotenv()
 
@@ -18,6 +25,80 @@ DB_NAME = os.getenv("DB_NAME", "food_business_db")
 client = MongoClient(MONGO_URI)
 db = client[DB_NAME]
 
+GRAPH_BATCH_SIZE = int(os.getenv("GRAPH_BATCH_SIZE", "1000"))
+
+# Bulk write queries; every batch is one UNWIND inside one explicit write transaction
+CONSTRAINT_QUERIES = [
+    "CREATE CONSTRAINT product_name_unique IF NOT EXISTS FOR (p:Product) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT shop_name_unique IF NOT EXISTS FOR (s:Shop) REQUIRE s.name IS UNIQUE",
+    "CREATE INDEX product_mongo_id IF NOT EXISTS FOR (p:Product) ON (p.mongo_id)",
+    "CREATE INDEX shop_mongo_id IF NOT EXISTS FOR (s:Shop) ON (s.mongo_id)",
+]
+
+DELETE_BATCH_QUERY = """
+MATCH (n)
+WITH n LIMIT $batch_size
+DETACH DELETE n
+RETURN count(*) AS deleted
+"""
+
+UPSERT_PRODUCTS_QUERY = """
+UNWIND $rows AS row
+MERGE (p:Product {name: row.name})
+SET p.mongo_id = row.mongo_id,
+    p.price = row.price,
+    p.discount_price = row.discount_price,
+    p.quantity = row.quantity,
+    p.category = row.category
+"""
+
+UPSERT_SHOPS_QUERY = """
+UNWIND $rows AS row
+MERGE (s:Shop {name: row.name})
+SET s.mongo_id = row.mongo_id,
+    s.address = row.address,
+    s.phone = row.phone,
+    s.delivery_charge = row.delivery_charge,
+    s.service_charge = row.service_charge
+"""
+
+LINK_SELLERS_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Shop {name: row.shop})
+MATCH (p:Product {name: row.product})
+OPTIONAL MATCH (s)-[existing:SELLS]->(p)
+MERGE (s)-[r:SELLS]->(p)
+ON CREATE SET r.since = datetime()
+RETURN count(CASE WHEN existing IS NULL THEN 1 END) AS created
+"""
+
+# Incremental changes (change_sync.py); records are matched by mongo_id so renames don't leave stale nodes
+DELETE_PRODUCTS_QUERY = """
+UNWIND $ids AS id
+MATCH (p:Product {mongo_id: id})
+DETACH DELETE p
+"""
+
+DELETE_SHOPS_QUERY = """
+UNWIND $ids AS id
+MATCH (s:Shop {mongo_id: id})
+DETACH DELETE s
+"""
+
+REMOVE_RENAMED_PRODUCTS_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Product {mongo_id: row.mongo_id})
+WHERE p.name <> row.name
+DETACH DELETE p
+"""
+
+REMOVE_RENAMED_SHOPS_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Shop {mongo_id: row.mongo_id})
+WHERE s.name <> row.name
+DETACH DELETE s
+"""
+
 class Neo4jConnection:
     def __init__(self):
         self.driver = GraphDatabase.driver(
@@ -32,6 +113,112 @@ class Neo4jConnection:
             result = session.run(query, parameters)
             return list(result)  # Consume results immediately
 
+    def execute_write(self, query, parameters=None):
+        """Run one query in an explicit (retried) write transaction"""
+        def work(tx):
+            return list(tx.run(query, parameters))
+        with self.driver.session() as session:
+            return session.execute_write(work)
+
+def batched(iterable, size=GRAPH_BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def product_row(prod):
+    return {
+        "mongo_id": str(prod.get('_id', '')),
+        "name": prod.get('productName', 'Unknown'),
+        "price": float(prod.get('price', 0)),
+        "discount_price": float(prod.get('productPrice', 0)),
+        "quantity": int(prod.get('quantity', 0)),
+        "category": prod.get('inventoryCategoryId', 'Uncategorized')
+    }
+
+def shop_row(shop):
+    return {
+        "mongo_id": str(shop.get('_id', '')),
+        "name": shop.get('shopName', 'Unknown Shop'),
+        "address": shop.get('shopAddress', ''),
+        "phone": shop.get('phoneNumber', ''),
+        "delivery_charge": float(shop.get('deliveryCharge', 0)),
+        "service_charge": float(shop.get('serviceCharge', 0))
+    }
+
+def to_rows(records, make_row, label):
+    """Convert Mongo records to query rows, skipping (and reporting) malformed ones"""
+    for record in records:
+        try:
+            yield make_row(record)
+        except (TypeError, ValueError) as e:
+            print(f"Skipping {label} {record.get('_id')}: {str(e)}")
+
+def seller_pairs(invoices):
+    """Distinct (shop, product) pairs; many invoice lines collapse into one relationship"""
+    seen = set()
+    for invoice in invoices:
+        pair = (invoice.get('shopName'), invoice.get('productName'))
+        if None not in pair and pair not in seen:
+            seen.add(pair)
+            yield {"shop": pair[0], "product": pair[1]}
+
+def bulk_load(neo4j, query, rows, label):
+    """Write rows in UNWIND batches and report throughput"""
+    started = time.monotonic()
+    total = 0
+    for batch in batched(rows):
+        neo4j.execute_write(query, {"rows": batch})
+        total += len(batch)
+        elapsed = time.monotonic() - started
+        print(f"Loaded {total} {label} ({total / max(elapsed, 1e-9):.0f} rows/sec)")
+    elapsed = time.monotonic() - started
+    print(f"✓ {total} {label} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/sec)")
+    return total
+
+def ensure_schema(neo4j):
+    """Uniqueness constraints for the loader plus the full-text indexes used by product/shop search"""
+    for query in CONSTRAINT_QUERIES + FULLTEXT_INDEX_QUERIES:
+        neo4j.execute_query(query)
+
+def clear_graph(neo4j, batch_size=GRAPH_BATCH_SIZE):
+    """Delete all nodes in bounded transactions instead of one huge one"""
+    total = 0
+    while True:
+        deleted = neo4j.execute_write(DELETE_BATCH_QUERY, {"batch_size": batch_size})[0]['deleted']
+        if not deleted:
+            break
+        total += deleted
+    print(f"Deleted {total} nodes")
+
+def apply_graph_changes(neo4j, upserts, deletes):
+    """Incremental counterpart of build_graph for the change-stream worker.
+
+    `upserts` maps collection -> changed Mongo records and `deletes` maps
+    collection -> deleted mongo ids. Seller links are only ever added: one
+    link is backed by many invoice lines, so a deleted line does not unlink
+    (the next full build reconciles). Returns whether the graph changed.
+    """
+    changed = False
+    for ids, query in ((deletes.get("inventories", []), DELETE_PRODUCTS_QUERY),
+                       (deletes.get("shops", []), DELETE_SHOPS_QUERY)):
+        for batch in batched(ids):
+            neo4j.execute_write(query, {"ids": batch})
+            changed = True
+
+    for records, make_row, label, remove_renamed, upsert in (
+        (upserts.get("inventories", []), product_row, "product", REMOVE_RENAMED_PRODUCTS_QUERY, UPSERT_PRODUCTS_QUERY),
+        (upserts.get("shops", []), shop_row, "shop", REMOVE_RENAMED_SHOPS_QUERY, UPSERT_SHOPS_QUERY)
+    ):
+        for batch in batched(to_rows(records, make_row, label)):
+            neo4j.execute_write(remove_renamed, {"rows": batch})
+            neo4j.execute_write(upsert, {"rows": batch})
+            changed = True
+
+    for batch in batched(seller_pairs(upserts.get("invoiceitems", []))):
+        result = neo4j.execute_write(LINK_SELLERS_QUERY, {"rows": batch})
+        changed = changed or bool(result and result[0]["created"])
+    return changed
+
 def build_graph():
     print("Initializing Neo4j connection to AuraDB...")
     neo4j = Neo4jConnection()
@@ -54,96 +241,37 @@ def build_graph():
 
     # Clear existing data
     print("Clearing existing graph data...")
-    neo4j.execute_query("MATCH (n) DETACH DELETE n")
+    clear_graph(neo4j)
+
+    # Uniqueness constraints first so the MERGEs below are index seeks
+    print("Ensuring constraints and indexes...")
+    ensure_schema(neo4j)
     
     # Create products
     print("Loading products...")
-    products = {}
-    inventory_count = db['inventories'].count_documents({})
-    print(f"Found {inventory_count} products to load")
-    
-    for i, prod in enumerate(db['inventories'].find(), 1):
-        query = """
-        CREATE (p:Product {
-            name: $name,
-            price: $price,
-            discount_price: $discount_price,
-            quantity: $quantity,
-            category: $category
-        })
-        RETURN id(p) as id
-        """
-        try:
-            result = neo4j.execute_query(query, {
-                "name": prod.get('productName', 'Unknown'),
-                "price": float(prod.get('price', 0)),
-                "discount_price": float(prod.get('productPrice', 0)),
-                "quantity": int(prod.get('quantity', 0)),
-                "category": prod.get('inventoryCategoryId', 'Uncategorized')
-            })
-            if result:
-                products[prod['productName']] = result[0]['id']
-                if i % 100 == 0:
-                    print(f"Processed {i}/{inventory_count} products")
-        except Exception as e:
-            print(f"Error creating product {prod.get('productName')}: {str(e)}")
+    print(f"Found {db['inventories'].count_documents({})} products to load")
+    products = bulk_load(
+        neo4j, UPSERT_PRODUCTS_QUERY,
+        to_rows(db['inventories'].find(), product_row, "product"), "products"
+    )
     
     # Create shops
     print("\nLoading shops...")
-    shops = {}
-    shop_count = db['shops'].count_documents({})
-    print(f"Found {shop_count} shops to load")
-    
-    for shop in db['shops'].find():
-        query = """
-        CREATE (s:Shop {
-            name: $name,
-            address: $address,
-            phone: $phone,
-            delivery_charge: $delivery_charge,
-            service_charge: $service_charge
-        })
-        RETURN id(s) as id
-        """
-        try:
-            result = neo4j.execute_query(query, {
-                "name": shop.get('shopName', 'Unknown Shop'),
-                "address": shop.get('shopAddress', ''),
-                "phone": shop.get('phoneNumber', ''),
-                "delivery_charge": float(shop.get('deliveryCharge', 0)),
-                "service_charge": float(shop.get('serviceCharge', 0))
-            })
-            if result:
-                shops[shop['shopName']] = result[0]['id']
-        except Exception as e:
-            print(f"Error creating shop {shop.get('shopName')}: {str(e)}")
+    print(f"Found {db['shops'].count_documents({})} shops to load")
+    shops = bulk_load(
+        neo4j, UPSERT_SHOPS_QUERY,
+        to_rows(db['shops'].find(), shop_row, "shop"), "shops"
+    )
     
     # Create relationships
     print("\nCreating seller relationships...")
-    invoice_count = db['invoiceitems'].count_documents({})
-    print(f"Processing {invoice_count} invoices for relationships")
-    
-    for invoice in db['invoiceitems'].find():
-        product_name = invoice.get('productName')
-        shop_name = invoice.get('shopName')
-        
-        if product_name in products and shop_name in shops:
-            query = """
-            MATCH (s:Shop), (p:Product)
-            WHERE id(s) = $shop_id AND id(p) = $product_id
-            MERGE (s)-[r:SELLS]->(p)
-            SET r.since = datetime()
-            """
-            try:
-                neo4j.execute_query(query, {
-                    "shop_id": shops[shop_name],
-                    "product_id": products[product_name]
-                })
-            except Exception as e:
-                print(f"Error linking {shop_name} -> {product_name}: {str(e)}")
+    print(f"Processing {db['invoiceitems'].count_documents({})} invoices for relationships")
+    invoices = db['invoiceitems'].find({}, {"_id": 0, "productName": 1, "shopName": 1})
+    bulk_load(neo4j, LINK_SELLERS_QUERY, seller_pairs(invoices), "seller links")
     
+    bump_data_version()
     print("\nGraph build completed successfully!")
-    print(f"Created: {len(products)} products, {len(shops)} shops")
+    print(f"Created: {products} products, {shops} shops")
     return neo4j
 
 if __name__ == "__main__":
@@ -1,11 +1,41 @@
+import re
+
+PRODUCT_FULLTEXT_INDEX = "product_fulltext"
+SHOP_FULLTEXT_INDEX = "shop_fulltext"
+
+# Created by the graph builder; the search queries below read through them
+FULLTEXT_INDEX_QUERIES = [
+    f"CREATE FULLTEXT INDEX {PRODUCT_FULLTEXT_INDEX} IF NOT EXISTS FOR (p:Product) ON EACH [p.name]",
+    f"CREATE FULLTEXT INDEX {SHOP_FULLTEXT_INDEX} IF NOT EXISTS FOR (s:Shop) ON EACH [s.name, s.address]",
+]
+
+# Question words that never help a name/address match
+STOP_WORDS = {
+    "a", "an", "and", "any", "are", "at", "can", "do", "does", "for", "from", "get", "have", "how",
+    "i", "in", "is", "it", "me", "much", "my", "of", "on", "or", "please", "tell", "the", "there",
+    "to", "what", "whats", "where", "which", "who", "with", "you", "price", "cost", "shop", "store",
+    "location", "phone", "number", "address"
+}
+
+def fulltext_query(question):
+    """Turn a free-text question into a Lucene query: lowercased word terms OR-ed together.
+
+    Lowercasing keeps words like AND/NOT from being read as operators and only
+    word characters survive, so no Lucene syntax from the user reaches the index.
+    Returns None when nothing searchable is left.
+    """
+    terms = [term for term in re.findall(r"\w+", question.lower()) if term not in STOP_WORDS]
+    if not terms:
+        return None
+    return " OR ".join(f"{term}~" if len(term) > 4 else term for term in dict.fromkeys(terms))
+
 GRAPH_QUERIES = {
-    "product_search": """
-    MATCH (p:Product)
-    WHERE toLower(p.name) CONTAINS toLower($query)
+    "product_search": f"""
+    CALL db.index.fulltext.queryNodes('{PRODUCT_FULLTEXT_INDEX}', $query) YIELD node AS p, score
     RETURN p LIMIT 3
     """,
     "shop_products": """
     MATCH (s:Shop {name: $shop_name})-[:SELLS]->(p:Product)
     RETURN p
     """
-}
\ No newline at end of file
+}
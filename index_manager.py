@@ -0,0 +1,95 @@
+#index_manager.py
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class Generation:
+    def __init__(self, name, store):
+        self.name = name
+        self.store = store
+        self.refs = 0  # searches currently using this generation
+        self.retired = False
+
+class VectorIndexManager:
+    """Serves one published index generation and hot-swaps newer ones in.
+
+    `resolve()` returns the directory of the published generation (or None)
+    and `load(directory)` a ready-to-search store for it. Searches pin the
+    generation they started on through acquire(), so a swap never pulls an
+    index out from under an in-flight search; a retired generation's
+    docstore connections are closed when its last search finishes.
+    """
+
+    def __init__(self, resolve, load):
+        self.resolve = resolve
+        self.load = load
+        self.current = None
+        self._lock = threading.Lock()  # guards current and refcounts; searches run on worker threads
+        self._refresh_lock = threading.Lock()
+        self.swaps = 0
+
+    @property
+    def generation(self):
+        current = self.current
+        return current.name if current else None
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            generation = self.current
+            if generation is None:
+                raise RuntimeError("No vector index generation is loaded")
+            generation.refs += 1
+        try:
+            yield generation.store
+        finally:
+            with self._lock:
+                generation.refs -= 1
+                release = generation.retired and generation.refs == 0
+            if release:
+                self._release(generation)
+
+    def _release(self, generation):
+        generation.store.close()
+        logger.info("Released index generation", extra={"fields": {"generation": generation.name}})
+
+    def refresh(self):
+        """Load the published generation if it is not the one being served (blocking; run in a thread).
+
+        The new generation is loaded and warmed while the old one keeps
+        serving; the swap itself is a pointer change under the lock. Returns
+        True when a new generation was swapped in.
+        """
+        with self._refresh_lock:
+            directory = self.resolve()
+            if directory is None:
+                if self.current is None:
+                    raise FileNotFoundError("No vector index has been published; build it with `python vector_store.py` "
+                                            "(or migrate an older index with `python update_vector_db.py`)")
+                return False
+            name = os.path.basename(directory)
+            if self.current is not None and self.current.name == name:
+                return False
+
+            new = Generation(name, self.load(directory))
+            with self._lock:
+                old, self.current = self.current, new
+                release = old is not None and old.refs == 0
+                if old is not None:
+                    old.retired = True
+            self.swaps += 1
+            logger.info("Serving index generation", extra={"fields": {"generation": name}})
+            if release:
+                self._release(old)
+            return True
+
+    def stats(self):
+        current = self.current
+        return {
+            "generation": current.name if current else None,
+            "active_searches": current.refs if current else 0,
+            "swaps": self.swaps
+        }
@@ -0,0 +1,287 @@
+#keyword_index.py
+import copy
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+import numpy as np
+from config import db, KEYWORD_DELTA_MAX_LINES
+from langchain.docstore.document import Document
+from vector_store import COLLECTION_RENDERERS, document_key
+
+KEYWORD_INDEX_PATH = "keyword_index"
+KEYWORD_COLLECTIONS = ["inventories", "shops", "sales_summaries"]
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def build_keyword_index(path=KEYWORD_INDEX_PATH):
+    """Offline BM25 build over the same rendered records as the vector index.
+
+    Layout of each build, which `path` symlinks to (all arrays are memory-mapped by the serving side):
+      terms.json          term -> [offset, length] into the postings arrays
+      postings_docs.npy   int32 doc ids, grouped by term
+      postings_tf.npy     float32 term frequencies, aligned with postings_docs
+      doc_lengths.npy     float32 token count per doc
+      docs.jsonl          one {"key", "text", "metadata"} line per doc
+      doc_offsets.npy     int64 byte offset of each docs.jsonl line
+      meta.json           corpus statistics
+      delta.jsonl         incremental upserts/deletes applied on top (see apply_changes)
+    """
+    def lines():
+        for collection_name in KEYWORD_COLLECTIONS:
+            projection, render = COLLECTION_RENDERERS[collection_name]
+            for record in db[collection_name].find({}, projection):
+                document = render(record)
+                yield {"key": document_key(collection_name, record["_id"]),
+                       "text": document.page_content, "metadata": document.metadata}
+
+    write_keyword_index(lines(), path)
+
+def write_keyword_index(lines, path=KEYWORD_INDEX_PATH):
+    """Write the index files for {"key", "text", "metadata"} lines and swap them in at `path`"""
+    started = time.monotonic()
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    postings = {}
+    doc_lengths = []
+    offsets = []
+    with open(os.path.join(tmp_path, "docs.jsonl"), "wb") as docs_file:
+        for line in lines:
+            doc_id = len(doc_lengths)
+            tokens = tokenize(line["text"])
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+            doc_lengths.append(len(tokens))
+            offsets.append(docs_file.tell())
+            docs_file.write((json.dumps(line, default=str) + "\n").encode())
+
+    terms = {}
+    postings_docs, postings_tf = [], []
+    offset = 0
+    for term, entries in postings.items():
+        terms[term] = [offset, len(entries)]
+        offset += len(entries)
+        postings_docs.extend(doc_id for doc_id, _ in entries)
+        postings_tf.extend(tf for _, tf in entries)
+
+    np.save(os.path.join(tmp_path, "postings_docs.npy"), np.asarray(postings_docs, dtype=np.int32))
+    np.save(os.path.join(tmp_path, "postings_tf.npy"), np.asarray(postings_tf, dtype=np.float32))
+    np.save(os.path.join(tmp_path, "doc_lengths.npy"), np.asarray(doc_lengths, dtype=np.float32))
+    np.save(os.path.join(tmp_path, "doc_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    with open(os.path.join(tmp_path, "terms.json"), "w") as f:
+        json.dump(terms, f)
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({
+            "documents": len(doc_lengths),
+            "avg_doc_length": float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+            "built_at": time.time()
+        }, f)
+    open(os.path.join(tmp_path, "delta.jsonl"), "w").close()
+
+    # `path` is a symlink to the current build, replaced atomically so it always resolves to a
+    # complete index; readers notice the new meta.json and reload
+    build_path = f"{path}.{time.time_ns()}"
+    os.rename(tmp_path, build_path)
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and previous is None:
+        os.rename(path, f"{path}.old")  # a plain directory from before the symlink layout
+        previous = f"{path}.old"
+    link_path = f"{path}.link"
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.basename(build_path), link_path)
+    os.replace(link_path, path)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+    print(f"✅ Keyword index: {len(doc_lengths)} docs, {len(terms)} terms in {time.monotonic() - started:.1f}s")
+
+def apply_changes(upserts, deletes, path=KEYWORD_INDEX_PATH):
+    """Append changed records to the delta log; returns the number of entries written.
+
+    `upserts` is a list of (key, Document) and `deletes` a list of keys. A
+    delta entry shadows the prebuilt copy of the same key until it is folded
+    in, by the next full build or by compact_delta once the log passes
+    KEYWORD_DELTA_MAX_LINES (every search scans the whole delta).
+    """
+    if not os.path.exists(path):
+        return 0
+    written = 0
+    with open(os.path.join(path, "delta.jsonl"), "a") as f:
+        for key, document in upserts:
+            if key.split(":", 1)[0] in KEYWORD_COLLECTIONS:
+                f.write(json.dumps({"op": "upsert", "key": key, "text": document.page_content,
+                                    "metadata": document.metadata}, default=str) + "\n")
+                written += 1
+        for key in deletes:
+            if key.split(":", 1)[0] in KEYWORD_COLLECTIONS:
+                f.write(json.dumps({"op": "delete", "key": key}) + "\n")
+                written += 1
+    with open(os.path.join(path, "delta.jsonl"), "rb") as f:
+        delta_lines = sum(1 for _ in f)
+    if delta_lines > KEYWORD_DELTA_MAX_LINES:
+        compact_delta(path)
+    return written
+
+def compact_delta(path=KEYWORD_INDEX_PATH):
+    """Fold delta.jsonl into a freshly written index (from the index's own files; Mongo is not read)"""
+    delta = {}
+    with open(os.path.join(path, "delta.jsonl")) as f:
+        for line in f:
+            if line.endswith("\n"):
+                entry = json.loads(line)
+                delta[entry["key"]] = None if entry["op"] == "delete" else entry
+
+    def lines():
+        with open(os.path.join(path, "docs.jsonl")) as f:
+            for line in f:
+                doc = json.loads(line)
+                if doc["key"] not in delta:
+                    yield doc
+        for key, entry in delta.items():
+            if entry is not None:
+                yield {"key": key, "text": entry["text"], "metadata": entry["metadata"]}
+
+    print(f"🔁 Folding {len(delta)} delta entries into the keyword index...")
+    write_keyword_index(lines(), path)
+
+class IndexSnapshot:
+    """One loaded index plus the delta read so far; never mutated once searches can see it"""
+
+    def __init__(self, path):
+        path = self.directory = os.path.realpath(path)  # the build it was loaded from, even after a swap
+        meta_path = os.path.join(path, "meta.json")
+        self.meta_stat = os.stat(meta_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "terms.json")) as f:
+            self.terms = json.load(f)
+        self.documents = meta["documents"]
+        self.avg_doc_length = meta["avg_doc_length"] or 1.0
+        self.postings_docs = np.load(os.path.join(path, "postings_docs.npy"), mmap_mode="r")
+        self.postings_tf = np.load(os.path.join(path, "postings_tf.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(path, "doc_lengths.npy"), mmap_mode="r")
+        self.doc_offsets = np.load(os.path.join(path, "doc_offsets.npy"), mmap_mode="r")
+        with open(os.path.join(path, "docs.jsonl"), "rb") as f:
+            self.docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.documents else b""
+        self.delta = {}  # key -> (token counts, length, doc line) or None when deleted
+        self.delta_offset = 0
+
+    def with_delta(self, data):
+        """A copy with the complete lines of `data` (read from delta_offset on) applied, or self if there are none"""
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return self
+        snapshot = copy.copy(self)
+        snapshot.delta = dict(self.delta)
+        for line in complete.decode().splitlines():
+            entry = json.loads(line)
+            if entry["op"] == "delete":
+                snapshot.delta[entry["key"]] = None
+            else:
+                tokens = tokenize(entry["text"])
+                snapshot.delta[entry["key"]] = (Counter(tokens), len(tokens), entry)
+        snapshot.delta_offset += len(complete)
+        return snapshot
+
+    def idf(self, df):
+        return math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+
+    def term_weight(self, tf, length, idf):
+        return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_doc_length))
+
+    def doc(self, doc_id):
+        start = int(self.doc_offsets[doc_id])
+        end = self.docs.find(b"\n", start)
+        return json.loads(self.docs[start:end])
+
+class KeywordIndex:
+    """Read side of the BM25 index: memory-mapped postings plus the in-memory delta.
+
+    refresh() builds a new IndexSnapshot and swaps it in with one assignment;
+    each search reads a single snapshot, so searches on worker threads never
+    see one half-updated.
+    """
+
+    def __init__(self, path=KEYWORD_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()  # one refresh at a time
+        self.snapshot = self._read_delta(IndexSnapshot(path))
+
+    def _read_delta(self, snapshot):
+        with open(os.path.join(snapshot.directory, "delta.jsonl"), "rb") as f:
+            f.seek(snapshot.delta_offset)
+            return snapshot.with_delta(f.read())
+
+    def refresh(self):
+        """Pick up a rebuilt index or newly appended delta lines"""
+        with self._lock:
+            snapshot = self.snapshot
+            try:
+                stat = os.stat(os.path.join(self.path, "meta.json"))
+                if (stat.st_ino, stat.st_mtime_ns) != (snapshot.meta_stat.st_ino, snapshot.meta_stat.st_mtime_ns):
+                    snapshot = IndexSnapshot(self.path)
+                self.snapshot = self._read_delta(snapshot)
+            except FileNotFoundError:
+                pass  # swapped out mid-read (or removed); keep serving the current snapshot
+
+    def search(self, question, k=5):
+        self.refresh()
+        snapshot = self.snapshot
+        terms = list(dict.fromkeys(tokenize(question)))
+        doc_parts, score_parts, idfs = [], [], {}
+        for term in terms:
+            entry = snapshot.terms.get(term)
+            df = entry[1] if entry else 0
+            idfs[term] = snapshot.idf(df)
+            if not entry:
+                continue
+            start, length = entry
+            doc_ids = snapshot.postings_docs[start:start + length]
+            tf = snapshot.postings_tf[start:start + length]
+            doc_parts.append(doc_ids)
+            score_parts.append(snapshot.term_weight(tf, snapshot.doc_lengths[doc_ids], idfs[term]))
+
+        hits = []
+        if doc_parts:
+            unique_docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            # Over-fetch so docs shadowed by the delta can be dropped without losing the top k
+            fetch = min(len(scores), k + len(snapshot.delta))
+            top = np.argpartition(-scores, fetch - 1)[:fetch]
+            for i in top:
+                line = snapshot.doc(int(unique_docs[i]))
+                if line["key"] not in snapshot.delta:
+                    hits.append((float(scores[i]), line))
+
+        for key, entry in snapshot.delta.items():
+            if entry is None:
+                continue
+            counts, length, line = entry
+            score = sum(snapshot.term_weight(counts[term], length, idfs[term]) for term in terms if counts[term])
+            if score > 0:
+                hits.append((score, line))
+
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [
+            Document(page_content=line["text"], metadata={**line["metadata"], "bm25_score": score})
+            for score, line in hits[:k]
+        ]
+
+def load_keyword_index(path=KEYWORD_INDEX_PATH):
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        print(f"🟡 No keyword index at {path}; run `python keyword_index.py` to build it.")
+        return None
+    return KeywordIndex(path)
+
+if __name__ == "__main__":
+    build_keyword_index()
@@ -1,10 +1,39 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import Optional
+from uuid import uuid4
 import asyncio
-from agent_graph import build_graph, explain_chain  # Now these imports will work
+import json
+import logging
+import time
+from agent_graph import (
+    build_graph, explain_chain, neo4j, init_backends, watch_vector_index, readiness, embed_question,
+    RETRIEVAL_BRANCHES, embedding_batcher, search_batcher, vector_index, memory, router, fast_answers
+)
+from answer_cache import answer_cache
+from vector_store import get_embeddings
+from metrics import record_request, render_metrics
+from request_log import configure_logging, request_id_var
+
+configure_logging()
+logger = logging.getLogger("main")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Serve immediately; backends load and warm up in the background while /ready reports 503"""
+    global chain
+    chain = build_graph()
+    init = asyncio.create_task(init_backends())
+    watcher = asyncio.create_task(watch_vector_index())
+    yield
+    init.cancel()
+    watcher.cancel()
+    await neo4j.close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS setup (keep your existing CORS configuration)
 app.add_middleware(
@@ -15,36 +44,202 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Build the graph
-chain = build_graph()
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag every log line of a request with its id (the caller's X-Request-ID, or a new one) and echo it back"""
+    request_id = request.headers.get("x-request-id") or uuid4().hex
+    token = request_id_var.set(request_id)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        logger.info("Request handled", extra={"fields": {
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - started) * 1000, 1)
+        }})
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+# Compiled in the lifespan
+chain = None
 
 class QuestionInput(BaseModel):
     question: str
+    session_id: Optional[str] = None  # continue a conversation; a new id is returned when omitted
+
+async def load_history(session_id):
+    try:
+        return await memory.history(session_id)
+    except Exception as e:
+        logger.warning("Could not load session history", extra={"fields": {"error": str(e)}})
+        return ""
+
+async def check_answer_cache(question, chat_history):
+    """Embed the question once and look it up; returns (vector, cached answer or None).
+
+    Follow-ups (the session already has history) depend on that history, so
+    they never hit the cache and are not stored in it either.
+    """
+    try:
+        vector = await embed_question(question)
+    except Exception as e:
+        logger.warning("Could not embed question for the answer cache", extra={"fields": {"error": str(e)}})
+        return None, None
+    if chat_history:
+        return vector, None
+    answer, similarity = answer_cache.lookup(vector)
+    if answer is not None:
+        logger.info("Answer cache hit", extra={"fields": {"similarity": round(similarity, 3)}})
+    return vector, answer
+
+def graph_input(question, vector, session_id, chat_history):
+    state = {"question": question, "session_id": session_id, "chat_history": chat_history}
+    if vector is not None:
+        state["question_vector"] = vector
+    return state
+
+def not_ready_response():
+    ready, components = readiness()
+    if ready:
+        return None
+    return JSONResponse(status_code=503, content={"error": "Service is starting up", "components": components})
 
 @app.post("/ask")
 async def ask_question(input: QuestionInput):
+    if (unavailable := not_ready_response()) is not None:
+        return unavailable
+    started = time.perf_counter()
     try:
-        print(f"📥 Received question: {input.question}")
-        result = await asyncio.to_thread(
-            chain.invoke,
-            {"question": input.question}
-        )
+        session_id = input.session_id or uuid4().hex
+        logger.info("Received question", extra={"fields": {"question": input.question, "session_id": session_id}})
+        chat_history = await load_history(session_id)
+        vector, cached = await check_answer_cache(input.question, chat_history)
+        if cached is not None:
+            memory.remember(session_id, input.question, cached.content)
+            record_request("ask", "cached", started)
+            return {"question": input.question, "answer": cached, "cached": True, "session_id": session_id}
+
+        result = await chain.ainvoke(graph_input(input.question, vector, session_id, chat_history))
+        answer = result.get("final_answer")
+        # Answers built without a timed-out or failed branch's results are not worth repeating
+        if answer is not None and vector is not None and not chat_history and not result.get("degraded"):
+            answer_cache.store(input.question, vector, answer)
+        record_request("ask", "answered", started)
         return {
             "question": input.question,
-            "answer": result.get("final_answer", "No response generated")
+            "answer": answer or "No response generated",
+            "cached": False,
+            "session_id": session_id
         }
     except Exception as e:
-        print(f"❌ Error occurred: {e}")
+        logger.exception("Question failed")
+        record_request("ask", "error", started)
         return {"error": str(e)}
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ask/stream")
+async def ask_question_stream(input: QuestionInput):
+    """Server-sent events: one `retrieval` event per finished branch, then `token` events, then `done`"""
+    if (unavailable := not_ready_response()) is not None:
+        return unavailable
+    session_id = input.session_id or uuid4().hex
+
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            logger.info("Received streaming question",
+                        extra={"fields": {"question": input.question, "session_id": session_id}})
+            chat_history = await load_history(session_id)
+            vector, cached = await check_answer_cache(input.question, chat_history)
+            if cached is not None:
+                memory.remember(session_id, input.question, cached.content)
+                record_request("ask_stream", "cached", started)
+                yield sse_event("done", {
+                    "question": input.question, "answer": cached.content, "cached": True, "session_id": session_id
+                })
+                return
+
+            async for mode, chunk in chain.astream(
+                graph_input(input.question, vector, session_id, chat_history),
+                stream_mode=["updates", "messages"]
+            ):
+                if mode == "updates":
+                    for node, update in chunk.items():
+                        if node == "route":
+                            yield sse_event("route", {
+                                key: update.get(key) for key in ("intent", "route_confidence", "branches")
+                            })
+                        elif node in RETRIEVAL_BRANCHES:
+                            yield sse_event("retrieval", {
+                                "source": node,
+                                "results": (update or {}).get("raw_data", [])
+                            })
+                        elif node == "final":
+                            answer = update["final_answer"]
+                            if vector is not None and not chat_history and not update.get("degraded"):
+                                answer_cache.store(input.question, vector, answer)
+                            record_request("ask_stream", "answered", started)
+                            yield sse_event("done", {
+                                "question": input.question,
+                                "answer": answer.content,
+                                "cached": False,
+                                "session_id": session_id
+                            })
+                else:
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") == "explain" and message.content:
+                        yield sse_event("token", {"text": message.content})
+        except Exception as e:
+            logger.exception("Streaming question failed")
+            record_request("ask_stream", "error", started)
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the vector index and Neo4j are loaded and warmed, 503 until then"""
+    ready, components = readiness()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "components": components})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: per-node and per-backend latency histograms, token counts,
+    context sizes, error counters and in-flight gauges"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/stats")
+async def stats():
+    return {
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": get_embeddings().stats(),
+        "query_batching": {"embedding": embedding_batcher.stats(), "search": search_batcher.stats()},
+        "vector_index": vector_index.stats(),
+        "neo4j": neo4j.stats(),
+        "router": router.stats(),
+        "fast_answers": fast_answers.stats(),
+        "sessions": memory.stats()
+    }
+
 @app.get("/test")
 async def test_chain():
     try:
-        test_response = explain_chain.invoke({
+        test_response = await explain_chain.ainvoke({
             "question": "Test question",
             "semantic_results": "Test data",
             "keyword_results": "Test keywords",
             "graph_results": "Test graph",
+            "chat_history": "(new conversation)",
             "current_date": "2025-05-17"
         })
         return {"response": test_response.content}
@@ -0,0 +1,97 @@
+#metrics.py
+# Prometheus metrics for the agent pipeline, served on GET /metrics by main.py.
+#
+# With several uvicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty
+# directory before starting them so /metrics aggregates every worker instead
+# of reporting whichever one answered the scrape.
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CHARS_BUCKETS = (0, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+NODE_SECONDS = Histogram("agent_node_seconds", "Graph node latency", ["node"], buckets=LATENCY_BUCKETS)
+NODE_ERRORS = Counter("agent_node_errors_total", "Graph nodes that raised", ["node"])
+BACKEND_SECONDS = Histogram(
+    "agent_backend_seconds", "Backend call latency (embedding, faiss, bm25, neo4j, llm, llm_summary)",
+    ["backend"], buckets=LATENCY_BUCKETS
+)
+BACKEND_ERRORS = Counter("agent_backend_errors_total", "Backend calls that raised", ["backend"])
+IN_FLIGHT = Gauge("agent_in_flight", "Graph nodes and backend calls currently running", ["stage"],
+                  multiprocess_mode="livesum")
+RETRIEVAL_FALLBACKS = Counter(
+    "agent_retrieval_fallbacks_total", "Retrieval branches answered with no results", ["branch", "reason"]
+)
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens by call and kind (prompt, completion)", ["call", "kind"])
+CONTEXT_CHARS = Histogram("agent_context_chars", "Characters per prompt section", ["source"], buckets=CHARS_BUCKETS)
+CONTEXT_ITEMS = Histogram("agent_context_items", "Results per retrieval branch", ["source"],
+                          buckets=(0, 1, 2, 3, 5, 10, 20))
+ROUTED_QUESTIONS = Counter(
+    "agent_routed_questions_total", "Questions by routed intent; mode fallback ran every branch", ["intent", "mode"]
+)
+ROUTED_BRANCHES = Histogram("agent_routed_branches", "Retrieval branches run per question", buckets=(0, 1, 2, 3))
+FAST_ANSWERS = Counter(
+    "agent_fast_answers_total", "Lookups answered from a template (outcome answered) or sent to the LLM (reason)",
+    ["intent", "outcome"]
+)
+REQUESTS = Counter("agent_requests_total", "Answered questions by endpoint and outcome", ["endpoint", "outcome"])
+REQUEST_SECONDS = Histogram("agent_request_seconds", "End-to-end question latency", ["endpoint"],
+                            buckets=LATENCY_BUCKETS)
+
+@contextmanager
+def _track(stage, seconds, errors):
+    IN_FLIGHT.labels(stage).inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:  # timed out by the caller; counted in RETRIEVAL_FALLBACKS
+        raise
+    except Exception:
+        errors.inc()
+        seconds.observe(time.perf_counter() - started)
+        raise
+    else:
+        seconds.observe(time.perf_counter() - started)
+    finally:
+        IN_FLIGHT.labels(stage).dec()
+
+def track_backend(backend):
+    """`with track_backend("neo4j"): ...` times one backend call (works in threads too)"""
+    return _track(backend, BACKEND_SECONDS.labels(backend), BACKEND_ERRORS.labels(backend))
+
+def instrument_node(name, step):
+    """Wrap a graph node (sync or async) with latency, error and in-flight metrics"""
+    @functools.wraps(step)
+    async def node(state):
+        with _track(name, NODE_SECONDS.labels(name), NODE_ERRORS.labels(name)):
+            if asyncio.iscoroutinefunction(step):
+                return await step(state)
+            return step(state)
+    return node
+
+def record_tokens(call, message):
+    """Count the prompt/completion tokens the provider reported on an AIMessage, if any"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        LLM_TOKENS.labels(call, "prompt").inc(usage["input_tokens"])
+    if usage.get("output_tokens"):
+        LLM_TOKENS.labels(call, "completion").inc(usage["output_tokens"])
+
+def record_request(endpoint, outcome, started):
+    REQUESTS.labels(endpoint, outcome).inc()
+    REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+
+def render_metrics():
+    """(body, content type) for the Prometheus text exposition"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,100 @@
+#partitioned_store.py
+import asyncio
+import numpy as np
+from ann_index import add_vectors, delete_vectors, tombstones
+
+def collection_of(doc_id):
+    """Chunk ids are `collection:mongo_id:n` (see vector_store.chunk_document)"""
+    return doc_id.split(":", 1)[0]
+
+class PartitionedVectorStore:
+    """One LangChain FAISS store per Mongo collection.
+
+    Writes are routed by the chunk's `collection` metadata; searches only
+    scan the requested partitions and merge their hits by L2 distance, which
+    is comparable across partitions because they share one embedding model.
+    """
+
+    def __init__(self, embedding_function, partitions=None, new_partition=None):
+        self.embedding_function = embedding_function
+        self.partitions = partitions or {}  # collection -> FAISS
+        self.new_partition = new_partition  # (collection, dim) -> empty FAISS
+
+    @property
+    def ntotal(self):
+        return sum(partition.index.ntotal for partition in self.partitions.values())
+
+    def add_embeddings(self, text_embeddings, metadatas, ids):
+        groups = {}
+        for item in zip(text_embeddings, metadatas, ids):
+            groups.setdefault(item[1]["collection"], []).append(item)
+        for collection, items in groups.items():
+            if collection not in self.partitions:
+                self.partitions[collection] = self.new_partition(collection, len(items[0][0][1]))
+            group_embeddings, group_metadatas, group_ids = zip(*items)
+            add_vectors(self.partitions[collection], list(group_embeddings), list(group_metadatas), list(group_ids))
+        return ids
+
+    def delete(self, ids):
+        groups = {}
+        for doc_id in ids:
+            groups.setdefault(collection_of(doc_id), []).append(doc_id)
+        for collection, group_ids in groups.items():
+            if collection in self.partitions:
+                delete_vectors(self.partitions[collection], group_ids)
+        return True
+
+    def close(self):
+        for partition in self.partitions.values():
+            if hasattr(partition.docstore, "close"):
+                partition.docstore.close()
+
+    def batch_search_with_score_by_vector(self, embeddings, k=4, collections=None):
+        """Search many query vectors with one matrix FAISS search per partition.
+
+        `collections[i]` lists the partitions query i may use (None: all).
+        Returns one [(Document, L2 distance)] list per query, best first.
+        """
+        routes = collections or [None] * len(embeddings)
+        hits = [[] for _ in embeddings]
+        for collection, partition in self.partitions.items():
+            rows = [i for i, route in enumerate(routes) if route is None or collection in route]
+            if not rows or not partition.index.ntotal:
+                continue
+            matrix = np.asarray([embeddings[i] for i in rows], dtype=np.float32)
+            # Deleted chunks of ANN partitions stay in the index as tombstones: fetch extra hits to skip them
+            distances, positions = partition.index.search(matrix, k + min(tombstones(partition), k))
+            for row, row_distances, row_positions in zip(rows, distances, positions):
+                hits[row].extend(
+                    (float(distance), partition, int(position))
+                    for distance, position in zip(row_distances, row_positions) if position != -1
+                )
+
+        results = []
+        for row_hits in hits:
+            row_hits.sort(key=lambda hit: hit[0])
+            found = []
+            for distance, partition, position in row_hits:
+                doc_id = partition.index_to_docstore_id.get(position)
+                if doc_id is not None:
+                    found.append((partition.docstore.search(doc_id), distance))
+                    if len(found) == k:
+                        break
+            results.append(found)
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, collections=None):
+        return self.batch_search_with_score_by_vector([embedding], k, [collections])[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, collections=None):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, collections)]
+
+    def similarity_search(self, query, k=4, collections=None):
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k, collections)
+
+    async def asimilarity_search_by_vector(self, embedding, k=4, collections=None):
+        return await asyncio.to_thread(self.similarity_search_by_vector, embedding, k, collections)
+
+    async def asimilarity_search(self, query, k=4, collections=None):
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_by_vector(embedding, k, collections)
@@ -0,0 +1,73 @@
+#query_batcher.py
+import asyncio
+from config import QUERY_BATCH_WINDOW_MS, QUERY_BATCH_MAX_SIZE
+
+class MicroBatcher:
+    """Coalesces concurrent calls into one `handler(items)` call.
+
+    The first submitted item opens a window of `window_ms`; everything that
+    arrives before it closes (or until `max_size` items are waiting) goes to
+    the handler together, which must return one result per item in order.
+    Each caller awaits only its own result, and a handler error is raised
+    in every caller of that batch.
+    """
+
+    def __init__(self, handler, window_ms=QUERY_BATCH_WINDOW_MS, max_size=QUERY_BATCH_MAX_SIZE):
+        self.handler = handler
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.pending = []  # (item, future)
+        self._timer = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._after_window())
+        return await future
+
+    async def _after_window(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # the caller may have timed out meanwhile
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch
+        }
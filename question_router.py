@@ -0,0 +1,182 @@
+#question_router.py
+# Rule-based intent router for the agent graph: question words plus the catalogue
+# vocabulary (product, brand and shop names from Mongo) decide which retrieval
+# branches a question needs. Unsure decisions fall back to running all of them.
+import re
+import threading
+from collections import Counter
+from graph_db.queries import STOP_WORDS
+from config import db, ROUTER_MIN_CONFIDENCE, ROUTER_ENTITY_COVERAGE
+
+ALL_BRANCHES = ["semantic_search", "keyword_search", "graph_search"]
+
+# Words that signal what is being asked
+INTENT_CUES = {
+    "product": {"price", "prices", "cost", "cheap", "cheapest", "cheaper", "discount", "discounts", "offer",
+                "offers", "product", "products", "stock", "available", "availability", "brand", "brands",
+                "buy", "quantity", "sell", "sells"},
+    "shop": {"shop", "shops", "store", "stores", "location", "located", "address", "where", "delivery",
+             "service", "charge", "charges", "owner", "contact", "phone", "open", "near", "nearest"},
+    "sales": {"sold", "sales", "sale", "selling", "revenue", "invoice", "invoices", "bestseller",
+              "bestsellers", "popular", "trend", "trending", "recently", "units"},
+    "account": {"user", "users", "customer", "customers", "account", "accounts", "premium", "verified",
+                "profile", "subscription", "registered", "members"},
+    "smalltalk": {"hi", "hello", "hey", "thanks", "thank", "thx", "bye", "goodbye", "ok", "okay",
+                  "cool", "great", "morning", "evening", "afternoon", "good", "nice"},
+}
+
+# intent -> retrieval plan. "entity" applies when the question names a catalogue product/shop
+# (exact keyword and graph lookups are enough), "vague" when it only describes one.
+ROUTE_PLANS = {
+    "product": {"entity": ["keyword_search", "graph_search"], "vague": ["semantic_search", "keyword_search"],
+                "collections": ["inventories"], "graph_query": "product_search"},
+    "shop": {"entity": ["keyword_search", "graph_search"], "vague": ["semantic_search", "graph_search"],
+             "collections": ["shops"], "graph_query": "shop_search"},
+    "sales": {"entity": ["keyword_search"], "vague": ["semantic_search", "keyword_search"],
+              "collections": ["sales_summaries"], "graph_query": None},
+    "account": {"entity": ["semantic_search"], "vague": ["semantic_search"],
+                "collections": ["users"], "graph_query": None},
+    "smalltalk": {"entity": [], "vague": [], "collections": [], "graph_query": None},
+}
+# Vector partitions per cue, for the fall-back plan; questions matching none search DEFAULT_COLLECTIONS
+FALLBACK_COLLECTIONS = {"product": "inventories", "shop": "shops", "sales": "sales_summaries", "account": "users"}
+DEFAULT_COLLECTIONS = ["inventories", "shops"]
+
+ENTITY_WEIGHT = 1.0  # a catalogue name in the question
+VOCABULARY_WEIGHT = 0.5  # a word from some catalogue name
+MAX_ENTITIES = 3
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def name_tokens(name):
+    return {token for token in tokenize(name) if token not in STOP_WORDS}
+
+class CatalogueVocabulary:
+    """Product and shop names indexed by token, for spotting catalogue entities in a question"""
+
+    def __init__(self, products=(), shops=(), brands=()):
+        self.names = {"product": {}, "shop": {}}  # kind -> name -> tokens
+        self.by_token = {"product": {}, "shop": {}}  # kind -> token -> names
+        self.duplicates = {"product": set(), "shop": set()}  # kind -> names held by more than one record
+        for kind, names in (("product", products), ("shop", shops)):
+            counts = Counter(names)
+            self.duplicates[kind] = {name for name, count in counts.items() if count > 1}
+            for name in counts:
+                tokens = name_tokens(name) if isinstance(name, str) else set()
+                if tokens:
+                    self.names[kind][name] = tokens
+                    for token in tokens:
+                        self.by_token[kind].setdefault(token, set()).add(name)
+        # Digits ("12", "400") match too many names to say anything about the intent on their own
+        self.words = {kind: {token for token in by_token if not token.isdigit()}
+                      for kind, by_token in self.by_token.items()}
+        self.words["product"] |= {token for brand in brands if isinstance(brand, str) for token in name_tokens(brand)}
+
+    def __len__(self):
+        return sum(len(names) for names in self.names.values())
+
+    def entities(self, kind, words):
+        """Catalogue names of `kind` mostly spelled out in `words`, best match first"""
+        candidates = set()
+        for word in words:
+            candidates |= self.by_token[kind].get(word, set())
+        matches = []
+        for name in candidates:
+            tokens = self.names[kind][name]
+            coverage = len(tokens & words) / len(tokens)
+            if coverage >= ROUTER_ENTITY_COVERAGE:
+                matches.append((coverage, len(tokens), name))
+        matches.sort(reverse=True)
+        return [{"name": name, "exact": coverage == 1.0, "duplicate": name in self.duplicates[kind]}
+                for coverage, _, name in matches[:MAX_ENTITIES]]
+
+def load_vocabulary(database=None):
+    """One name per record (not distinct), so names shared by several records are known"""
+    database = database if database is not None else db
+    def names(collection_name, field):
+        return [record.get(field) for record in database[collection_name].find({}, {field: 1, "_id": 0})]
+
+    return CatalogueVocabulary(
+        products=names("inventories", "productName"),
+        shops=names("shops", "shopName"),
+        brands=database["inventories"].distinct("brandName")
+    )
+
+class QuestionRouter:
+    """Classify a question (product, shop, sales, account, smalltalk) and pick its retrieval plan"""
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary or CatalogueVocabulary()
+        self.lock = threading.Lock()
+        self.routed = {}  # intent -> questions
+        self.fallbacks = 0
+        self.branches_run = 0
+
+    def load(self, database=None):
+        self.vocabulary = load_vocabulary(database)  # swapped whole; in-flight routes keep the old one
+        return len(self.vocabulary)
+
+    def classify(self, question):
+        """(intent, confidence, entities, scores); intent is None when nothing matched"""
+        words = set(tokenize(question))
+        vocabulary = self.vocabulary
+        scores = {intent: float(len(words & cues)) for intent, cues in INTENT_CUES.items()}
+        entities = {}
+        for kind in ("product", "shop"):
+            entities[kind] = vocabulary.entities(kind, words)
+            if entities[kind]:
+                scores[kind] += ENTITY_WEIGHT
+            elif words & vocabulary.words[kind]:
+                scores[kind] += VOCABULARY_WEIGHT
+
+        total = sum(scores.values())
+        if not total:
+            return None, 0.0, entities, scores
+        intent = max(scores, key=scores.get)
+        confidence = scores[intent] / total
+        if intent == "smalltalk" and words - INTENT_CUES["smalltalk"] - STOP_WORDS:
+            confidence = 0.0  # a greeting in front of a real question
+        return intent, round(confidence, 3), entities, scores
+
+    def route(self, question, follow_up=False):
+        """Retrieval plan for a question: intent, confidence, branches, partitions, graph query and entities.
+
+        Low-confidence questions, and follow-ups that name no catalogue entity
+        (they usually lean on the conversation), run every branch.
+        """
+        intent, confidence, entities, scores = self.classify(question)
+        named = entities["product"] or entities["shop"]
+        fallback = (intent is None or confidence < ROUTER_MIN_CONFIDENCE
+                    or (follow_up and not named and intent != "smalltalk"))
+        if fallback:
+            plan = {
+                "branches": list(ALL_BRANCHES),
+                "collections": [collection for intent_name, collection in FALLBACK_COLLECTIONS.items()
+                                if scores[intent_name] >= 1] or DEFAULT_COLLECTIONS,
+                "graph_query": "shop_search" if scores["shop"] > scores["product"] else "product_search"
+            }
+        else:
+            route = ROUTE_PLANS[intent]
+            plan = {
+                "branches": list(route["entity"] if named else route["vague"]),
+                "collections": list(route["collections"]),
+                "graph_query": route["graph_query"]
+            }
+        with self.lock:
+            self.routed[intent or "unknown"] = self.routed.get(intent or "unknown", 0) + 1
+            self.fallbacks += fallback
+            self.branches_run += len(plan["branches"])
+        return {"intent": intent or "unknown", "route_confidence": confidence, "routed": not fallback,
+                "entities": entities, **plan}
+
+    def stats(self):
+        with self.lock:
+            questions = sum(self.routed.values())
+            return {
+                "vocabulary_names": len(self.vocabulary),
+                "questions": questions,
+                "by_intent": dict(self.routed),
+                "fallbacks": self.fallbacks,
+                "avg_branches": self.branches_run / questions if questions else 0.0
+            }
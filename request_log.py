@@ -0,0 +1,45 @@
+#request_log.py
+import contextvars
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from config import LOG_LEVEL, LOG_JSON
+
+# Set per request by the middleware in main.py; graph nodes and batch tasks inherit it
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: timestamp, level, logger, request id, message and any `extra={"fields": {...}}`"""
+
+    def __init__(self, as_json=LOG_JSON):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": request_id_var.get(),
+            "message": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if self.as_json:
+            return json.dumps(entry, default=str)
+        return " ".join(f"{key}={value}" for key, value in entry.items())
+
+def configure_logging(level=LOG_LEVEL):
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(StructuredFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+def copy_request_context():
+    """A fresh context carrying only the request id, for background work spawned by a request"""
+    context = contextvars.Context()
+    context.run(request_id_var.set, request_id_var.get())
+    return context
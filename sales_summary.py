@@ -0,0 +1,187 @@
+#sales_summary.py
+# One summary document per product and per shop, aggregated from invoiceitems inside Mongo
+# ($group + $merge) into the sales_summaries collection. The vector and keyword indexes embed
+# these summaries instead of one chunk per invoice line, so their size follows the catalogue
+# rather than the sales history. Needs MongoDB 5.2+ ($sortArray).
+#
+#   python sales_summary.py          # incremental: only products/shops with new or edited lines
+#   python sales_summary.py --full   # recompute everything and drop summaries left without lines
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from config import (
+    db, SALES_SUMMARY_WINDOWS_DAYS, SALES_SUMMARY_TOP, SALES_SUMMARY_LOOKBACK_SECONDS, SALES_SUMMARY_DECAY_SECONDS
+)
+
+SUMMARY_COLLECTION = "sales_summaries"
+STATE_COLLECTION = "sales_summary_state"
+STATE_ID = "invoiceitems"
+# kind -> (invoiceitems field grouped by, field listed as its top counterparts)
+SUMMARY_KINDS = {"product": ("productName", "shopName"), "shop": ("shopName", "productName")}
+NAMES_PER_AGGREGATION = 1000
+
+def utc_now():
+    """Naive UTC, which is what pymongo hands back for stored dates"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def window_field(days):
+    return f"units_{days}d"
+
+def summary_pipeline(kind, now, names=None):
+    """Aggregate invoice lines of one kind (all names, or only `names`) and $merge them into sales_summaries"""
+    field, counterpart = SUMMARY_KINDS[kind]
+    match = {field: {"$in": list(names)}} if names is not None else {field: {"$type": "string", "$ne": ""}}
+    windows = {window_field(days): now - timedelta(days=days) for days in SALES_SUMMARY_WINDOWS_DAYS}
+    return [
+        {"$match": match},
+        {"$project": {
+            "name": f"${field}",
+            "counterpart": f"${counterpart}",
+            "quantity": {"$ifNull": ["$quantity", 0]},
+            "amount": {"$ifNull": ["$amount", 0]},
+            "price": "$price",
+            "discounted": {"$cond": [{"$gt": [{"$ifNull": ["$productDiscount", 0]}, 0]}, 1, 0]},
+            "sold_at": {"$ifNull": ["$createdAt", {"$toDate": "$_id"}]}  # lines without createdAt: insert time
+        }},
+        # Per (name, counterpart) first, so the top shops of a product (or products of a shop) fall out of the same pass
+        {"$group": {
+            "_id": {"name": "$name", "counterpart": "$counterpart"},
+            "lines": {"$sum": 1},
+            "units": {"$sum": "$quantity"},
+            "revenue": {"$sum": "$amount"},
+            "min_price": {"$min": "$price"},
+            "max_price": {"$max": "$price"},
+            "discounted_lines": {"$sum": "$discounted"},
+            "first_sold": {"$min": "$sold_at"},
+            "last_sold": {"$max": "$sold_at"},
+            **{window: {"$sum": {"$cond": [{"$gte": ["$sold_at", since]}, "$quantity", 0]}}
+               for window, since in windows.items()}
+        }},
+        {"$group": {
+            "_id": "$_id.name",
+            "lines": {"$sum": "$lines"},
+            "units_sold": {"$sum": "$units"},
+            "revenue": {"$sum": "$revenue"},
+            "min_price": {"$min": "$min_price"},
+            "max_price": {"$max": "$max_price"},
+            "discounted_lines": {"$sum": "$discounted_lines"},
+            "first_sold": {"$min": "$first_sold"},
+            "last_sold": {"$max": "$last_sold"},
+            **{window: {"$sum": f"${window}"} for window in windows},
+            "counterparts": {"$push": {"name": "$_id.counterpart", "units": "$units"}}
+        }},
+        {"$project": {
+            "_id": {"$concat": [f"{kind}:", "$_id"]},
+            "kind": {"$literal": kind},
+            "name": "$_id",
+            **{key: 1 for key in ("lines", "units_sold", "revenue", "min_price", "max_price", "first_sold", "last_sold")},
+            **{window: 1 for window in windows},
+            "avg_price": {"$cond": [{"$gt": ["$units_sold", 0]}, {"$divide": ["$revenue", "$units_sold"]}, None]},
+            "discount_rate": {"$divide": ["$discounted_lines", "$lines"]},
+            "top": {"$slice": [{"$sortArray": {
+                "input": {"$filter": {"input": "$counterparts", "cond": {"$ne": [{"$ifNull": ["$$this.name", None]}, None]}}},
+                "sortBy": {"units": -1}
+            }}, SALES_SUMMARY_TOP]},
+            "updated_at": {"$literal": now}
+        }},
+        {"$merge": {"into": SUMMARY_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+def ensure_indexes():
+    """Per-name lookups for the incremental recompute, edit detection, and the recency/staleness scans"""
+    invoiceitems = db["invoiceitems"]
+    invoiceitems.create_index([("productName", ASCENDING), ("createdAt", DESCENDING)])
+    invoiceitems.create_index([("shopName", ASCENDING), ("createdAt", DESCENDING)])
+    invoiceitems.create_index([("updatedAt", ASCENDING)])
+    db[SUMMARY_COLLECTION].create_index([("last_sold", DESCENDING)])
+    db[SUMMARY_COLLECTION].create_index([("kind", ASCENDING), ("updated_at", ASCENDING)])
+
+def summarize(kind, now, names=None):
+    """Recompute the `kind` summaries of `names` (None: all) and drop the ones left without invoice lines"""
+    db["invoiceitems"].aggregate(summary_pipeline(kind, now, names))
+    stale = {"kind": kind, "updated_at": {"$lt": now}}
+    if names is not None:
+        stale["name"] = {"$in": list(names)}
+    return db[SUMMARY_COLLECTION].delete_many(stale).deleted_count
+
+def refresh_summaries(names, now=None):
+    """Recompute the summaries of the given products/shops: {"product": names, "shop": names}"""
+    now = now or utc_now()
+    recomputed = 0
+    for kind, kind_names in names.items():
+        kind_names = sorted(kind_names)
+        for start in range(0, len(kind_names), NAMES_PER_AGGREGATION):
+            summarize(kind, now, kind_names[start:start + NAMES_PER_AGGREGATION])
+        recomputed += len(kind_names)
+    return recomputed
+
+def names_by_kind(lines):
+    """The products and shops that invoice lines belong to: {"product": names, "shop": names}"""
+    names = {kind: set() for kind in SUMMARY_KINDS}
+    for line in lines:
+        for kind, (field, _) in SUMMARY_KINDS.items():
+            if line.get(field):
+                names[kind].add(line[field])
+    return names
+
+def touched_names(since):
+    """Products and shops with invoice lines inserted (by _id time) or edited since `since`"""
+    projection = {field: 1 for field, _ in SUMMARY_KINDS.values()}
+    query = {"$or": [{"_id": {"$gte": ObjectId.from_datetime(since)}}, {"updatedAt": {"$gte": since}}]}
+    return names_by_kind(db["invoiceitems"].find(query, projection))
+
+def active_names(since):
+    """Summaries with sales inside the longest recency window as of `since`; their window counts decay over time"""
+    names = {kind: set() for kind in SUMMARY_KINDS}
+    cutoff = since - timedelta(days=max(SALES_SUMMARY_WINDOWS_DAYS))
+    for summary in db[SUMMARY_COLLECTION].find({"last_sold": {"$gte": cutoff}}, {"kind": 1, "name": 1}):
+        names[summary["kind"]].add(summary["name"])
+    return names
+
+def decay_summaries(now=None):
+    """Recompute the recently active summaries if SALES_SUMMARY_DECAY_SECONDS have passed since the
+    last decay pass (for change_sync.py, which refreshes touched names itself); returns how many"""
+    now = now or utc_now()
+    state = db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+    if state is None or (now - state["decayed_at"]).total_seconds() < SALES_SUMMARY_DECAY_SECONDS:
+        return 0
+    recomputed = refresh_summaries(active_names(state["decayed_at"]), now)
+    db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": {"decayed_at": now}})
+    return recomputed
+
+def refresh_sales_summaries(full=False):
+    """Bring sales_summaries up to date with invoiceitems.
+
+    Incremental runs only recompute products and shops with lines inserted or
+    edited since the last run (minus a lookback margin for late writers), plus,
+    every SALES_SUMMARY_DECAY_SECONDS, the recently active ones whose recency
+    windows have moved. Deleted lines are only reconciled by a full run (which
+    the full vector build does).
+    """
+    started = time.monotonic()
+    now = utc_now()
+    ensure_indexes()
+    state = db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+    if full or state is None:
+        removed = sum(summarize(kind, now) for kind in SUMMARY_KINDS)
+        db[STATE_COLLECTION].replace_one(
+            {"_id": STATE_ID}, {"watermark": now, "decayed_at": now}, upsert=True
+        )
+        print(f"📈 Sales summaries rebuilt: {db[SUMMARY_COLLECTION].count_documents({})} summaries, "
+              f"{removed} removed, in {time.monotonic() - started:.1f}s")
+        return
+
+    names = touched_names(state["watermark"] - timedelta(seconds=SALES_SUMMARY_LOOKBACK_SECONDS))
+    decayed_at = state["decayed_at"]
+    if (now - decayed_at).total_seconds() >= SALES_SUMMARY_DECAY_SECONDS:
+        for kind, active in active_names(decayed_at).items():
+            names[kind] |= active
+        decayed_at = now
+    recomputed = refresh_summaries(names, now)
+    db[STATE_COLLECTION].replace_one({"_id": STATE_ID}, {"watermark": now, "decayed_at": decayed_at}, upsert=True)
+    print(f"📈 Sales summaries: {recomputed} recomputed in {time.monotonic() - started:.1f}s")
+
+if __name__ == "__main__":
+    refresh_sales_summaries(full="--full" in sys.argv[1:])
@@ -0,0 +1,162 @@
+#session_memory.py
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from config import (
+    SESSION_WINDOW_TURNS, SESSION_TURN_CHARS, SESSION_SUMMARY_CHARS, SESSION_IDLE_SECONDS,
+    SESSION_MAX_COUNT, SESSION_REDIS_URL
+)
+from request_log import copy_request_context
+
+logger = logging.getLogger(__name__)
+
+class InMemorySessionStore:
+    """Per-process session states, least recently used first; idle and excess sessions are evicted"""
+
+    backend = "memory"
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, max_sessions=SESSION_MAX_COUNT):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # session id -> (state, last used)
+        self.evictions = 0
+
+    def _evict(self, now):
+        while self.sessions:
+            session_id, (_, last_used) = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and now - last_used <= self.idle_seconds:
+                break
+            del self.sessions[session_id]
+            self.evictions += 1
+
+    async def get(self, session_id):
+        now = time.monotonic()
+        self._evict(now)
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            return None
+        self.sessions[session_id] = (entry[0], now)
+        self.sessions.move_to_end(session_id)
+        return entry[0]
+
+    async def put(self, session_id, state):
+        now = time.monotonic()
+        self.sessions[session_id] = (state, now)
+        self.sessions.move_to_end(session_id)
+        self._evict(now)
+
+    def stats(self):
+        return {"backend": self.backend, "sessions": len(self.sessions), "evictions": self.evictions}
+
+class RedisSessionStore:
+    """Session states shared by every worker; Redis expires idle sessions"""
+
+    backend = "redis"
+
+    def __init__(self, url, idle_seconds=SESSION_IDLE_SECONDS):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError("SESSION_REDIS_URL is set but the redis package is missing; `pip install redis`")
+        self.client = redis.from_url(url)
+        self.idle_seconds = idle_seconds
+
+    @staticmethod
+    def _key(session_id):
+        return f"session:{session_id}"
+
+    async def get(self, session_id):
+        raw = await self.client.getex(self._key(session_id), ex=int(self.idle_seconds))
+        return json.loads(raw) if raw else None
+
+    async def put(self, session_id, state):
+        await self.client.set(self._key(session_id), json.dumps(state), ex=int(self.idle_seconds))
+
+    def stats(self):
+        return {"backend": self.backend}
+
+class ConversationMemory:
+    """Bounded per-session history for the prompt.
+
+    A session keeps its last `window` turns verbatim (answers clipped to
+    `turn_chars`); older turns are folded by `summarize(summary, turns)` into
+    a running summary clipped to `summary_chars`. What reaches the prompt is
+    therefore bounded however long the conversation runs.
+    """
+
+    def __init__(self, store, summarize, window=SESSION_WINDOW_TURNS,
+                 turn_chars=SESSION_TURN_CHARS, summary_chars=SESSION_SUMMARY_CHARS):
+        self.store = store
+        self.summarize = summarize
+        self.window = window
+        self.turn_chars = turn_chars
+        self.summary_chars = summary_chars
+        self._locks = weakref.WeakValueDictionary()  # session id -> Lock held while its turns are applied
+        self._tasks = set()
+        self.summarizations = 0
+        self.summary_failures = 0
+
+    @staticmethod
+    def format_turns(turns):
+        return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+
+    async def history(self, session_id):
+        """Prompt-ready history: the running summary, then the recent turns verbatim"""
+        state = await self.store.get(session_id) if session_id else None
+        if not state:
+            return ""
+        parts = []
+        if state["summary"]:
+            parts.append(f"Summary of earlier conversation: {state['summary']}")
+        if state["turns"]:
+            parts.append(self.format_turns(state["turns"]))
+        return "\n\n".join(parts)
+
+    async def add_turn(self, session_id, question, answer):
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        async with lock:
+            state = await self.store.get(session_id) or {"summary": "", "turns": []}
+            state["turns"].append([question, answer[:self.turn_chars]])
+            # Written before the summary call (an LLM round trip), so a follow-up sent meanwhile sees this turn
+            await self.store.put(session_id, state)
+            overflow = state["turns"][:-self.window]
+            if not overflow:
+                return
+            summary = state["summary"]
+            try:
+                summary = (await self.summarize(summary, overflow))[:self.summary_chars]
+                self.summarizations += 1
+            except Exception as e:
+                # Stay bounded even if the summary call fails: keep the old summary, drop the turns
+                logger.warning("Session summary failed, dropping old turns",
+                               extra={"fields": {"dropped_turns": len(overflow), "error": str(e)}})
+                self.summary_failures += 1
+            await self.store.put(session_id, {"summary": summary, "turns": state["turns"][-self.window:]})
+
+    def remember(self, session_id, question, answer):
+        """Record a turn in the background, outside the request's callback context (so summary
+        tokens never reach the answer stream) and off its latency path; only the request id carries over"""
+        if not session_id:
+            return
+        task = asyncio.create_task(self.add_turn(session_id, question, answer), context=copy_request_context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self):
+        return {
+            **self.store.stats(),
+            "window_turns": self.window,
+            "summarizations": self.summarizations,
+            "summary_failures": self.summary_failures,
+            "pending_updates": len(self._tasks)
+        }
+
+def make_session_store():
+    if SESSION_REDIS_URL:
+        return RedisSessionStore(SESSION_REDIS_URL)
+    return InMemorySessionStore()
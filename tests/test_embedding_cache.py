@@ -0,0 +1,16 @@
+from embedding_cache import DiskEmbeddingStore
+
+def test_put_many_drops_rows_left_by_an_interrupted_write(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path))
+    store.put_many([("a", [1.0, 1.0]), ("b", [2.0, 2.0])])
+    # A writer died after appending its vector but before writing its key line
+    with open(store.vectors_path, "ab") as f:
+        f.write(b"\x00\x00\x10\x41" * 2)
+    with open(store.keys_path, "a") as f:
+        f.write("half-written")
+
+    store.put_many([("c", [3.0, 3.0])])
+
+    reader = DiskEmbeddingStore(str(tmp_path))
+    assert reader.get_many(["a", "b", "c"]) == {"a": [1.0, 1.0], "b": [2.0, 2.0], "c": [3.0, 3.0]}
+    assert len(reader) == 3
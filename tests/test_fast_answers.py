@@ -0,0 +1,22 @@
+from benchmarks.fakes import FakeDatabase
+from fast_answers import FastAnswers
+from question_router import QuestionRouter, load_vocabulary
+
+def lookup(inventories):
+    router = QuestionRouter(load_vocabulary(FakeDatabase({"inventories": inventories, "shops": []})))
+    question = "What is the price of Milo 400g?"
+    record = {"p": {"name": "Milo 400g", "price": 1200, "discount_price": 0, "quantity": 4}}
+    state = {"question": question, **router.route(question), "graph_records": [record]}
+    fast_answers = FastAnswers()
+    return fast_answers.answer(state), fast_answers.stats()
+
+def test_unique_product_name_is_answered():
+    answer, stats = lookup([{"_id": 1, "productName": "Milo 400g"}])
+    assert answer is not None
+    assert stats["answered"] == 1
+
+def test_product_name_shared_by_two_inventories_goes_to_the_llm():
+    answer, stats = lookup([{"_id": 1, "productName": "Milo 400g", "price": 1200},
+                            {"_id": 2, "productName": "Milo 400g", "price": 1350}])
+    assert answer is None
+    assert stats["declined"] == {"ambiguous": 1}
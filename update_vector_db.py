@@ -1,38 +1,102 @@
 #update_vector_db.py
+import asyncio
 import os
-from datetime import datetime, timedelta
-from config import db, GEMINI_API_KEY
-from langchain.docstore.document import Document
-from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import shutil
+from config import db
+from vector_store import (
+    COLLECTION_RENDERERS, get_embeddings, get_splitter, load_generation, save_vector_db,
+    document_key, document_hash, chunk_document, load_sync_state, save_sync_state,
+    current_generation_path, generation_path, new_generation_name, publish_generation, migrate_legacy_index
+)
+from data_version import bump_data_version
+from sales_summary import refresh_sales_summaries
+import keyword_index
+from embedding_pipeline import embed_into_index, batched
+from ann_index import convert_index
 
+def apply_vector_changes(source, sync_state, upserts, deletes):
+    """Write and publish a new generation: `source` with `upserts` [(key, Document)] re-chunked and
+    re-embedded and the chunks of `deletes` [key] removed. `sync_state` is updated in place.
 
-DB_PATH = "faiss_index"
+    The changes go into a copy; the generation being served is never written
+    to. Returns the new generation's name, or None when nothing changed.
+    """
+    splitter = get_splitter()
+    stale_ids = []
+    new_chunks, new_ids = [], []
+    for key, document in upserts:
+        previous = sync_state.get(key)
+        if previous:
+            stale_ids.extend(previous["ids"])
+        chunks, ids = chunk_document(splitter, key, document)
+        new_chunks.extend(chunks)
+        new_ids.extend(ids)
+        sync_state[key] = {"hash": document_hash(document), "ids": ids}
+    for key in deletes:
+        if key in sync_state:
+            stale_ids.extend(sync_state.pop(key)["ids"])
+
+    if not stale_ids and not new_chunks:
+        return None
+
+    name = new_generation_name()
+    build_path = f"{generation_path(name)}.build"
+    shutil.copytree(source, build_path)
+    vector_db = load_generation(build_path, writable=True)
+    if stale_ids:
+        vector_db.delete(stale_ids)
+    if new_chunks:
+        asyncio.run(embed_into_index(
+            batched(zip(new_chunks, new_ids)), get_embeddings(), vector_db=vector_db, total=len(new_chunks)
+        ))
+    for partition in vector_db.partitions.values():
+        convert_index(partition)  # flat partitions that grew past ANN_MIN_VECTORS
+    save_vector_db(vector_db, build_path)
+    save_sync_state(sync_state, build_path)
+    vector_db.close()
+    os.rename(build_path, generation_path(name))
+    publish_generation(name)
+    print(f"✅ Synced: {len(new_chunks)} chunks upserted, {len(stale_ids)} stale chunks removed "
+          f"({len(deletes)} deleted records), {vector_db.ntotal} vectors in generation {name}.")
+    return name
 
 def update_vector_db():
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GEMINI_API_KEY)
-    if not os.path.exists(DB_PATH):
+    """Idempotent upsert/delete sync of the FAISS index against Mongo.
+
+    Every record is re-rendered with the same renderers as the full build and
+    compared by content hash with the last sync; only new or changed records
+    are re-embedded, their old chunks are replaced, and chunks of records that
+    no longer exist in Mongo are removed. The same changes are appended to the
+    keyword index's delta log. Sales summaries are brought up to date first.
+    """
+    migrate_legacy_index()
+    source = current_generation_path()
+    sync_state = load_sync_state(source) if source else None
+    if sync_state is None:
         print("Run full vector build first.")
         return
 
-    vector_db = FAISS.load_local(DB_PATH, embeddings)
-    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=30)
-    cutoff_time = datetime.utcnow() - timedelta(hours=1)
-
-    new_documents = []
-    for collection_name in db.list_collection_names():
-        collection = db[collection_name]
-        recent_docs = collection.find({"last_updated": {"$gte": cutoff_time}}, {"_id": 0})
-        for doc in recent_docs:
-            text = f"{doc.get('title', '')}\n{doc.get('description', '')}\n{doc.get('category', '')}"
-            metadata = {"collection": collection_name}
-            new_documents.append(Document(page_content=text, metadata=metadata))
-
-    if new_documents:
-        chunks = splitter.split_documents(new_documents)
-        vector_db.add_documents(chunks)
-        vector_db.save_local(DB_PATH)
-        print(f"✅ Updated with {len(chunks)} chunks.")
-    else:
+    refresh_sales_summaries()
+
+    seen = set()
+    changed = []
+    for collection_name, (projection, render) in COLLECTION_RENDERERS.items():
+        for record in db[collection_name].find({}, projection):
+            key = document_key(collection_name, record["_id"])
+            seen.add(key)
+            document = render(record)
+            previous = sync_state.get(key)
+            if previous and previous["hash"] == document_hash(document):
+                continue
+            changed.append((key, document))
+
+    deleted = [key for key in sync_state if key not in seen]
+    keyword_index.apply_changes(changed, deleted)
+
+    if apply_vector_changes(source, sync_state, changed, deleted) is None:
         print("🟡 No updates found.")
+        return
+    bump_data_version()
+
+if __name__ == "__main__":
+    update_vector_db()
@@ -1,131 +1,455 @@
 #vector_store.py
+import asyncio
+import fcntl
+import hashlib
+import json
 import os
-from config import db, GEMINI_API_KEY
+import queue
+import shutil
+import threading
+import faiss
+from datetime import datetime
+from config import (
+    db, GEMINI_API_KEY, EMBED_BATCH_SIZE, STREAM_QUEUE_BATCHES, STREAM_PROGRESS_EVERY, INDEX_GENERATIONS_KEEP,
+    SALES_SUMMARY_WINDOWS_DAYS
+)
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS  # ✅ Updated line
 from langchain.docstore.document import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from data_version import bump_data_version
+from embedding_cache import CachedEmbeddings
+from embedding_pipeline import embed_into_index
+from ann_index import convert_index, set_search_params, all_vectors
+from doc_store import SqliteDocstore, SqliteIndexMap, docstore_path, DOCSTORE_FILE
+from partitioned_store import PartitionedVectorStore
+from sales_summary import refresh_sales_summaries, window_field
 
 
 DB_PATH = "faiss_index"
+GENERATIONS_DIR = "generations"  # faiss_index/generations/<name>/<collection>/...
+CURRENT_FILE = "CURRENT"  # name of the generation to serve
+MIGRATE_LOCK_FILE = ".migrate.lock"
+INDEX_FILE = "index.faiss"
+SYNC_STATE_FILE = "sync_state.json"
 CHUNK_SIZE = 300
 CHUNK_OVERLAP = 30
+EMBEDDING_MODEL = "models/embedding-001"
 
-def build_vector_db():
-    documents = []
-    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-
-    # Process inventories collection for product data
-    inventory_collection = db['inventories']
-    for product in inventory_collection.find({}, {"_id": 0}):
-        text_parts = [
-            f"Product: {product.get('productName', '')}",
-            f"Type: {product.get('productType', '')}",
-            f"Brand: {product.get('brandName', '')}",
-            f"Regular Price: {product.get('price', 'N/A')}",
-            f"Discount Price: {product.get('productPrice', 'N/A')}",
-            f"Discount: {product.get('productDiscount', '0')}{'%' if product.get('discountType') == 'PERCENTAGE' else ' LKR'}",
-            f"Category: {product.get('inventoryCategoryId', '')}",
-            f"Quantity: {product.get('quantity', '')} {product.get('productType', '')}"
-        ]
-        
-        text = "\n".join(text_parts)
-        metadata = {
-            "collection": "inventories",
-            "product_name": product.get('productName', ''),
-            "price": product.get('price', ''),
-            "source": "mongodb"
-        }
-        documents.append(Document(page_content=text, metadata=metadata))
-        print(f"Added product: {product.get('productName', '')}")  # Debug
-
-    # Process invoiceitems collection for historical sales data
-    invoice_items_collection = db['invoiceitems']
-    for item in invoice_items_collection.find({}, {"_id": 0}):
-        text_parts = [
-            f"Item: {item.get('productName', '')}",
-            f"Sold Price: {item.get('price', 'N/A')}",
-            f"Quantity Sold: {item.get('quantity', '')}",
-            f"Total Amount: {item.get('amount', 'N/A')}",
-            f"Original Price: {item.get('productPrice', 'N/A')}",
-            f"Discount: {item.get('productDiscount', '0')}{'%' if item.get('discountType') == 'PERCENTAGE' else ' LKR'}"
-        ]
-        
-        text = "\n".join(text_parts)
-        metadata = {
-            "collection": "invoiceitems",
-            "product_name": item.get('productName', ''),
-            "price": item.get('price', ''),
-            "source": "mongodb"
-        }
-        documents.append(Document(page_content=text, metadata=metadata))
-    # Process users collection
-    users_collection = db['users']
-    for user in users_collection.find({}, {"_id": 0, "password": 0, "firebaseToken": 0, "__v": 0}):  # Exclude sensitive fields
-        text_parts = [
-            f"User Name: {user.get('name', 'N/A')}",
-            f"Email: {user.get('email', 'N/A')}",
-            f"Phone: {user.get('phoneNumber', 'N/A')}",
-            f"User Type: {user.get('userType', 'N/A')}",
-            f"Role: {user.get('role', 'N/A')}",
-            f"Premium Status: {user.get('premiumStatus', 'N/A')}",
-            f"Premium Type: {user.get('premiumUserType', 'N/A')}",
-            f"Verification Status: {user.get('verifiedStatus', 'N/A')}",
-            f"Account Medium: {user.get('medium', 'N/A')}",
-            f"Manages Inventory: {'Yes' if user.get('isMaintainInventory', False) else 'No'}"
-        ]
-        
-        text = "\n".join([part for part in text_parts if not part.endswith('N/A')])
-        metadata = {
-            "collection": "users",
-            "user_name": user.get('name', ''),
-            "email": user.get('email', ''),
-            "type": "user_profile",
-            "source": "mongodb"
-        }
-        documents.append(Document(page_content=text, metadata=metadata))
-        print(f"Added user: {user.get('name', '')}")  # Debug
-
-
-     # Process shops collection
-    shops_collection = db['shops']
-    for shop in shops_collection.find({}, {"_id": 0, "__v": 0}):  # Exclude _id and __v
-        text_parts = [
-            f"Shop Name: {shop.get('shopName', 'N/A')}",
-            f"Owner: {shop.get('ownerName', 'N/A')}",
-            f"Address: {shop.get('shopAddress', 'N/A')}",
-            f"Phone: {shop.get('phoneNumber', 'N/A')}",
-            f"Service Charge: {shop.get('serviceCharge', '0')} {shop.get('serviceChargeType', 'LKR')}",
-            f"Delivery Charge: {shop.get('deliveryCharge', '0')} LKR",
-            f"Note: {shop.get('shortNote', '')}"
-        ]
-        
-        text = "\n".join([part for part in text_parts if not part.endswith('N/A')])
-        metadata = {
-            "collection": "shops",
-            "shop_name": shop.get('shopName', ''),
-            "type": "shop_info",
-            "source": "mongodb"
-        }
-        documents.append(Document(page_content=text, metadata=metadata))
-        print(f"Added shop: {shop.get('shopName', '')}")  # Debug
-
-
-    print(f"Total documents before splitting: {len(documents)}")  # Debug
-    chunks = splitter.split_documents(documents)
-    print(f"Total chunks after splitting: {len(chunks)}")  # Debug
-    
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001", 
-        google_api_key=GEMINI_API_KEY  # Use from config
+_embeddings = None
+
+def get_embeddings():
+    """Process-wide embeddings client backed by the query LRU and the shared on-disk cache"""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=GEMINI_API_KEY),
+            EMBEDDING_MODEL
+        )
+    return _embeddings
+
+def render_inventory(product):
+    """Product data from the inventories collection"""
+    text_parts = [
+        f"Product: {product.get('productName', '')}",
+        f"Type: {product.get('productType', '')}",
+        f"Brand: {product.get('brandName', '')}",
+        f"Regular Price: {product.get('price', 'N/A')}",
+        f"Discount Price: {product.get('productPrice', 'N/A')}",
+        f"Discount: {product.get('productDiscount', '0')}{'%' if product.get('discountType') == 'PERCENTAGE' else ' LKR'}",
+        f"Category: {product.get('inventoryCategoryId', '')}",
+        f"Quantity: {product.get('quantity', '')} {product.get('productType', '')}"
+    ]
+
+    text = "\n".join(text_parts)
+    metadata = {
+        "collection": "inventories",
+        "mongo_id": str(product.get('_id', '')),
+        "product_name": product.get('productName', ''),
+        "price": product.get('price', ''),
+        "source": "mongodb"
+    }
+    return Document(page_content=text, metadata=metadata)
+
+def format_amount(value):
+    return f"{value:,.0f}" if isinstance(value, (int, float)) else "N/A"
+
+def render_sales_summary(summary):
+    """Aggregated sales of one product or shop from the sales_summaries collection (see sales_summary.py).
+    Kept compact so one summary stays within a single chunk."""
+    kind = summary.get('kind', 'product')
+    windows = ", ".join(f"{days}d: {summary.get(window_field(days), 0)}" for days in SALES_SUMMARY_WINDOWS_DAYS)
+    top = ", ".join(f"{entry['name']} ({entry['units']})" for entry in summary.get('top', []))
+    last_sold = summary.get('last_sold')
+    text_parts = [
+        f"Sales of {kind} {summary.get('name', '')}: {summary.get('units_sold', 0)} units ({windows})",
+        f"Revenue: {format_amount(summary.get('revenue'))} LKR over {summary.get('lines', 0)} invoice lines",
+        f"Sold at: {format_amount(summary.get('min_price'))}-{format_amount(summary.get('max_price'))} LKR "
+        f"(avg {format_amount(summary.get('avg_price'))}), {summary.get('discount_rate', 0):.0%} discounted"
+        if kind == "product" else f"Discounted lines: {summary.get('discount_rate', 0):.0%}",
+        f"Top {'shops' if kind == 'product' else 'products'}: {top or 'N/A'}",
+        f"Last sold: {last_sold:%Y-%m-%d}" if last_sold else "Last sold: N/A"
+    ]
+
+    text = "\n".join([part for part in text_parts if not part.endswith('N/A')])
+    metadata = {
+        "collection": "sales_summaries",
+        "mongo_id": str(summary.get('_id', '')),
+        "kind": kind,
+        f"{kind}_name": summary.get('name', ''),
+        "units_sold": summary.get('units_sold', 0),
+        "source": "mongodb"
+    }
+    return Document(page_content=text, metadata=metadata)
+
+def render_user(user):
+    """User profiles; sensitive fields are excluded by the collection projection"""
+    text_parts = [
+        f"User Name: {user.get('name', 'N/A')}",
+        f"Email: {user.get('email', 'N/A')}",
+        f"Phone: {user.get('phoneNumber', 'N/A')}",
+        f"User Type: {user.get('userType', 'N/A')}",
+        f"Role: {user.get('role', 'N/A')}",
+        f"Premium Status: {user.get('premiumStatus', 'N/A')}",
+        f"Premium Type: {user.get('premiumUserType', 'N/A')}",
+        f"Verification Status: {user.get('verifiedStatus', 'N/A')}",
+        f"Account Medium: {user.get('medium', 'N/A')}",
+        f"Manages Inventory: {'Yes' if user.get('isMaintainInventory', False) else 'No'}"
+    ]
+
+    text = "\n".join([part for part in text_parts if not part.endswith('N/A')])
+    metadata = {
+        "collection": "users",
+        "mongo_id": str(user.get('_id', '')),
+        "user_name": user.get('name', ''),
+        "email": user.get('email', ''),
+        "type": "user_profile",
+        "source": "mongodb"
+    }
+    return Document(page_content=text, metadata=metadata)
+
+def render_shop(shop):
+    """Shop details from the shops collection"""
+    text_parts = [
+        f"Shop Name: {shop.get('shopName', 'N/A')}",
+        f"Owner: {shop.get('ownerName', 'N/A')}",
+        f"Address: {shop.get('shopAddress', 'N/A')}",
+        f"Phone: {shop.get('phoneNumber', 'N/A')}",
+        f"Service Charge: {shop.get('serviceCharge', '0')} {shop.get('serviceChargeType', 'LKR')}",
+        f"Delivery Charge: {shop.get('deliveryCharge', '0')} LKR",
+        f"Note: {shop.get('shortNote', '')}"
+    ]
+
+    text = "\n".join([part for part in text_parts if not part.endswith('N/A')])
+    metadata = {
+        "collection": "shops",
+        "mongo_id": str(shop.get('_id', '')),
+        "shop_name": shop.get('shopName', ''),
+        "type": "shop_info",
+        "source": "mongodb"
+    }
+    return Document(page_content=text, metadata=metadata)
+
+# collection -> (Mongo projection, renderer); shared by the full build and the incremental sync
+COLLECTION_RENDERERS = {
+    "inventories": (None, render_inventory),
+    "sales_summaries": ({"updated_at": 0}, render_sales_summary),  # not invoiceitems: one chunk per line scales with sales
+    "users": ({"password": 0, "firebaseToken": 0, "__v": 0}, render_user),  # Exclude sensitive fields
+    "shops": ({"__v": 0}, render_shop),
+}
+
+def get_splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+def document_key(collection_name, mongo_id):
+    return f"{collection_name}:{mongo_id}"
+
+def document_hash(document):
+    payload = json.dumps([document.page_content, document.metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def chunk_document(splitter, key, document):
+    """Split one rendered record; chunk ids are stable so the sync can replace them later"""
+    chunks = splitter.split_documents([document])
+    ids = [f"{key}:{i}" for i in range(len(chunks))]
+    return chunks, ids
+
+def load_sync_state(path):
+    """Mongo document key -> {"hash": rendered content hash, "ids": FAISS docstore ids}"""
+    state_path = os.path.join(path, SYNC_STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        return json.load(f)
+
+def save_sync_state(state, path):
+    state_path = os.path.join(path, SYNC_STATE_FILE)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def produce_chunk_batches(collection_name, projection, render, out, stop, sync_state, batch_size=EMBED_BATCH_SIZE):
+    """Producer thread: stream one collection's cursor through render and split into fixed-size batches.
+
+    `out.put` blocks while the queue is full, which is what bounds memory when
+    embedding falls behind the Mongo scan.
+    """
+    def put(item):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    splitter = get_splitter()
+    batch = []
+    count = 0
+    try:
+        for record in db[collection_name].find({}, projection):
+            if stop.is_set():
+                return
+            document = render(record)
+            key = document_key(collection_name, record["_id"])
+            chunks, ids = chunk_document(splitter, key, document)
+            sync_state[key] = {"hash": document_hash(document), "ids": ids}
+            batch.extend(zip(chunks, ids))
+            while len(batch) >= batch_size:
+                put(batch[:batch_size])
+                batch = batch[batch_size:]
+            count += 1
+            if count % STREAM_PROGRESS_EVERY == 0:
+                print(f"📄 {collection_name}: {count} records read")
+        if batch:
+            put(batch)
+        print(f"📄 {collection_name}: done, {count} records")
+    finally:
+        put(None)  # end-of-collection marker
+
+async def stream_chunk_batches(sync_state, stop):
+    """Scan all collections in parallel and yield (chunk, id) batches as they are produced"""
+    out = queue.Queue(maxsize=STREAM_QUEUE_BATCHES)
+    producers = [
+        asyncio.create_task(asyncio.to_thread(
+            produce_chunk_batches, collection_name, projection, render, out, stop, sync_state
+        ))
+        for collection_name, (projection, render) in COLLECTION_RENDERERS.items()
+    ]
+    finished = 0
+    while finished < len(producers):
+        batch = await asyncio.to_thread(out.get)
+        if batch is None:
+            finished += 1
+        else:
+            yield batch
+    await asyncio.gather(*producers)  # surface producer errors
+
+def new_partition(path, dim):
+    """Empty flat store whose documents go straight into the SQLite docstore at `path`"""
+    os.makedirs(path, exist_ok=True)
+    return FAISS(get_embeddings(), faiss.IndexFlatL2(dim), SqliteDocstore(docstore_path(path)), {})
+
+def save_partition(vector_db, path):
+    """Write index.faiss and the SQLite docstore (documents plus position -> id map); no pickle"""
+    os.makedirs(path, exist_ok=True)
+    index_path = os.path.join(path, INDEX_FILE)
+    faiss.write_index(vector_db.index, f"{index_path}.tmp")
+    os.replace(f"{index_path}.tmp", index_path)
+
+    docstore = vector_db.docstore
+    if not isinstance(docstore, SqliteDocstore):
+        docstore = SqliteDocstore(docstore_path(path))
+        docstore.add(vector_db.docstore._dict)
+        vector_db.docstore = docstore
+    docstore.write_positions(vector_db.index_to_docstore_id)
+    docstore.commit()
+
+def save_vector_db(vector_db, path):
+    """One sub-directory per collection partition"""
+    for collection_name, partition in vector_db.partitions.items():
+        save_partition(partition, os.path.join(path, collection_name))
+
+def generation_path(name, path=DB_PATH):
+    return os.path.join(path, GENERATIONS_DIR, name)
+
+def new_generation_name():
+    return datetime.now().strftime("%Y%m%dT%H%M%S%f")  # sorts in publish order
+
+def current_generation(path=DB_PATH):
+    """Name of the last published generation, or None"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def publish_generation(name, path=DB_PATH):
+    """Atomically point CURRENT at a finished generation; serving processes swap it in on their next check"""
+    current_path = os.path.join(path, CURRENT_FILE)
+    with open(f"{current_path}.tmp", "w") as f:
+        f.write(name)
+    os.replace(f"{current_path}.tmp", current_path)
+    prune_generations(path)
+
+def prune_generations(path=DB_PATH, keep=INDEX_GENERATIONS_KEEP):
+    """Drop all but the newest `keep` generations; older ones have had time to be swapped out"""
+    current = current_generation(path)
+    names = sorted(name for name in os.listdir(os.path.join(path, GENERATIONS_DIR)) if not name.endswith(".build"))
+    for name in names[:-keep]:
+        if name != current:
+            shutil.rmtree(generation_path(name, path), ignore_errors=True)
+
+def migrate_to_generations(path=DB_PATH):
+    """One-off move of an index written before versioned generations into the first one"""
+    name = new_generation_name()
+    target = generation_path(name, path)
+    print(f"🔁 Moving the index in {path} into generation {name}...")
+    os.makedirs(target)
+    for entry in os.listdir(path):
+        if entry not in (GENERATIONS_DIR, MIGRATE_LOCK_FILE):
+            os.rename(os.path.join(path, entry), os.path.join(target, entry))
+    publish_generation(name, path)
+    return name
+
+def has_legacy_index(path=DB_PATH):
+    """An index written before generations: files directly in `path` and nothing published"""
+    return (current_generation(path) is None and os.path.isdir(path)
+            and any(entry not in (GENERATIONS_DIR, MIGRATE_LOCK_FILE) for entry in os.listdir(path)))
+
+def migrate_legacy_index(path=DB_PATH):
+    """Bring an index from an older release up to the current layout (generations, per-collection
+    partitions, SQLite docstore). Build/sync jobs call this; serving processes only ever read, so
+    several workers never race to rename the same files. Serialised across jobs by an flock."""
+    if not os.path.isdir(path):
+        return
+    with open(os.path.join(path, MIGRATE_LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if has_legacy_index(path):
+                migrate_to_generations(path)
+            name = current_generation(path)
+            if name and os.path.exists(os.path.join(generation_path(name, path), INDEX_FILE)):
+                migrate_unpartitioned_index(generation_path(name, path))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def current_generation_path(path=DB_PATH):
+    """Directory of the published generation, or None when nothing has been built (or migrated)"""
+    name = current_generation(path)
+    return generation_path(name, path) if name else None
+
+def partitioned_store(path, partitions=None):
+    return PartitionedVectorStore(
+        get_embeddings(), partitions,
+        new_partition=lambda collection_name, dim: new_partition(os.path.join(path, collection_name), dim)
     )
-    
-    vector_db = FAISS.from_documents(chunks, embeddings)
-    vector_db.save_local(DB_PATH)
+
+async def abuild_vector_db():
+    """Build a new generation from Mongo and publish it"""
+    await asyncio.to_thread(refresh_sales_summaries, full=True)
+    name = new_generation_name()
+    build_path = f"{generation_path(name)}.build"
+    os.makedirs(build_path)
+
+    sync_state = {}
+    stop = threading.Event()
+    batches = stream_chunk_batches(sync_state, stop)
+    vector_db = partitioned_store(build_path)
+    try:
+        try:
+            await embed_into_index(batches, get_embeddings(), vector_db=vector_db)
+        finally:
+            stop.set()
+            await batches.aclose()
+        if not vector_db.partitions:
+            raise ValueError("No documents found in MongoDB to index")
+
+        print(f"Total documents: {len(sync_state)}, chunks: {vector_db.ntotal}")
+        for collection_name, partition in vector_db.partitions.items():
+            print(f"  {collection_name}: {partition.index.ntotal} chunks")
+            convert_index(partition)
+        save_vector_db(vector_db, build_path)
+        save_sync_state(sync_state, build_path)
+        os.rename(build_path, generation_path(name))
+    except BaseException:
+        # A failed or empty build must not leave a .build directory that prune_generations never sees
+        vector_db.close()
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+    publish_generation(name)
+    bump_data_version()
+    print(f"✅ Published index generation {name}")
     return vector_db
-def load_vector_db():
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GEMINI_API_KEY)
-    if os.path.exists(DB_PATH):
-        return FAISS.load_local(DB_PATH, embeddings, allow_dangerous_deserialization=True)
+
+def build_vector_db():
+    return asyncio.run(abuild_vector_db())
+
+def migrate_pickled_index(path):
+    """One-off conversion of an index written by FAISS.save_local (index.pkl) to the SQLite docstore"""
+    print(f"🔁 Migrating pickled docstore in {path} to {DOCSTORE_FILE}...")
+    legacy = FAISS.load_local(path, get_embeddings(), allow_dangerous_deserialization=True)
+    save_partition(legacy, path)
+    os.remove(os.path.join(path, "index.pkl"))
+
+def migrate_unpartitioned_index(path):
+    """One-off split of a single combined index into per-collection partitions, reusing its vectors"""
+    print(f"🔁 Splitting the combined index in {path} into per-collection partitions...")
+    if not os.path.exists(docstore_path(path)):
+        migrate_pickled_index(path)
+    legacy = load_partition(path, writable=True)
+    vectors = all_vectors(legacy.index)
+    vector_db = partitioned_store(path)
+    text_embeddings, metadatas, ids = [], [], []
+    for position, doc_id in sorted(legacy.index_to_docstore_id.items()):
+        document = legacy.docstore.search(doc_id)
+        text_embeddings.append((document.page_content, vectors[position].tolist()))
+        metadatas.append({"collection": "unknown", **document.metadata})
+        ids.append(doc_id)
+    vector_db.add_embeddings(text_embeddings, metadatas, ids)
+    for partition in vector_db.partitions.values():
+        convert_index(partition)
+    save_vector_db(vector_db, path)
+    legacy.docstore.close()
+    os.remove(os.path.join(path, INDEX_FILE))
+    os.remove(docstore_path(path))
+
+def load_partition(path, writable=False):
+    """Serving processes memory-map the index and docstore read-only; build/sync jobs pass writable=True"""
+    index_path = os.path.join(path, INDEX_FILE)
+    if writable:
+        index = faiss.read_index(index_path)
+        docstore = SqliteDocstore(docstore_path(path))
+        index_to_docstore_id = SqliteIndexMap(docstore).to_dict()
     else:
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            index = faiss.read_index(index_path)  # index types without mmap support
+        docstore = SqliteDocstore(docstore_path(path), readonly=True)
+        index_to_docstore_id = SqliteIndexMap(docstore)
+    set_search_params(index)
+    return FAISS(get_embeddings(), index, docstore, index_to_docstore_id)
+
+def load_generation(path, writable=False):
+    """Load every collection partition of one generation directory"""
+    if os.path.exists(os.path.join(path, INDEX_FILE)):
+        raise FileNotFoundError(f"{path} holds an unpartitioned index from an older release; "
+                                "migrate it with `python update_vector_db.py`")
+    partitions = {
+        collection_name: load_partition(os.path.join(path, collection_name), writable)
+        for collection_name in sorted(os.listdir(path)) if os.path.exists(os.path.join(path, collection_name, INDEX_FILE))
+    }
+    return partitioned_store(path, partitions)
+
+def load_vector_db(writable=False, path=DB_PATH, build_if_missing=True):
+    migrate_legacy_index(path)
+    directory = current_generation_path(path)
+    if directory is None:
+        if not build_if_missing:
+            raise FileNotFoundError(f"No vector index at {path}; build it with `python vector_store.py`")
         return build_vector_db()
+    return load_generation(directory, writable)
+
+if __name__ == "__main__":
+    build_vector_db()